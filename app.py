@@ -4,30 +4,190 @@ import shutil
 import base64
 import sys
 import atexit
-from flask import Flask, render_template, request, redirect, flash, url_for, send_from_directory
+import threading
+import time
+import logging
+import importlib.util
+import json
+import mimetypes
+import hashlib
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, Request, render_template, request, redirect, flash, url_for, send_from_directory, g, \
+    stream_with_context
 from werkzeug.utils import secure_filename
-from encryptor import generate_keys, encrypt_message
-from stego import embed_message_dct, extract_message_dct, calculate_max_capacity_dct
-from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP
-from Crypto.Hash import SHA256
-from Crypto import Random
+from jobs import JobManager, JobQueueFull
+from storage import StorageManager
+import instrumentation
+from instrumentation import span
+
+def lazy_import(name):
+    """Import a module on first attribute access instead of at load time
+
+    Keeps worker boot and health checks fast: NumPy, SciPy, soundfile and
+    PyCryptodome are only loaded when a request needs them (or by warmup()).
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+stego = lazy_import('stego')
+encryptor = lazy_import('encryptor')
+keypool = lazy_import('keypool')
+keyregistry = lazy_import('keyregistry')
+transform = lazy_import('transform')
+transform_cache_module = lazy_import('transform_cache')
+
+# The application owns logging configuration; library modules only use their own loggers
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['KEY_FOLDER'] = 'static/keys'
 app.config['ALLOWED_EXTENSIONS'] = {'flac', 'wav'}
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
+app.config['RSA_KEY_SIZE'] = 2048  # 2048, 3072 or 4096
+app.config['KEY_POOL_SIZE'] = 4  # Key pairs generated ahead of time
+app.config['KEY_POOL_LOW_WATER'] = 1  # Refill the pool when it drops to this size
+app.config['MAX_RECIPIENTS'] = 8  # Key pairs (recipients) allowed per /encrypt request
+app.config['KEY_REGISTRY_FOLDER'] = 'public_keys'  # Registered recipient public keys (see POST /keys)
+app.config['KEY_CACHE_SIZE'] = 256  # Parsed keys and OAEP ciphers kept in memory, keyed by key hash
+app.config['STEGO_CHANNEL_MODE'] = 'spread'  # 'spread' keeps every channel and spreads the payload, 'first' uses channel 0
+app.config['JOB_WORKERS'] = 2  # Background jobs running at the same time
+app.config['JOB_MAX_PENDING'] = 8  # Jobs allowed to wait before new ones are rejected
+app.config['TRANSFORM_BACKEND'] = 'scipy'  # 'scipy', 'fftpack' or 'fftw' (needs pyfftw)
+app.config['TRANSFORM_WORKERS'] = 1  # Threads per transform; requests, jobs and bulk files already run in parallel (None = all cores)
+app.config['TRANSFORM_CACHE_FOLDER'] = 'cache/transform'
+app.config['TRANSFORM_CACHE_MEMORY'] = 256 * 1024 * 1024  # Legacy DCT coefficients kept in memory
+app.config['TRANSFORM_CACHE_DISK'] = 1024 * 1024 * 1024  # Legacy DCT coefficients kept on disk
+app.config['STEGO_OUTPUT_FORMAT'] = None  # None keeps the upload's container, or 'WAV', 'FLAC', 'AIFF', ...
+app.config['STEGO_OUTPUT_SUBTYPE'] = None  # None keeps the upload's bit depth, or 'PCM_16', 'PCM_24', 'FLOAT', ...
+app.config['STEGO_FLAC_COMPRESSION'] = None  # FLAC compression level 0.0-1.0, None = libsndfile default
+app.config['STEGO_SPARSE_OUTPUT'] = True  # Uncompressed PCM outputs: copy the upload and rewrite only payload frames
+app.config['PCM_PREFETCH_WORKERS'] = 1  # Uploads decoded ahead of /encrypt at the same time
+app.config['BULK_DECRYPT_WORKERS'] = os.cpu_count() or 1  # Files extracted at the same time by /decrypt/bulk
+app.config['BULK_DECRYPT_MAX_FILES'] = 1000  # Audio files accepted per /decrypt/bulk request
+app.config['BULK_DECRYPT_MAX_EXTRACTED'] = 2 * 1024 * 1024 * 1024  # Uncompressed size allowed from one archive
+app.config['STORAGE_QUOTA'] = 2 * 1024 * 1024 * 1024  # Bytes allowed in the upload and key folders together
+app.config['STORAGE_TTL'] = 3600  # Seconds a file may go unused before it is deleted
+app.config['STORAGE_SWEEP_INTERVAL'] = 60  # Seconds between background sweeps
+app.config['SPOOL_MAX_MEMORY'] = 32 * 1024 * 1024  # Uploaded files and /api/encrypt output kept in memory up to this size
+app.config['API_STREAM_CHUNK'] = 64 * 1024  # Bytes per chunk when streaming /api/encrypt output
+app.config['METRICS_ENABLED'] = True  # Stage timings, counters, /metrics and per-request logs
 app.secret_key = os.urandom(24)
 
-# Create directories if they don't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['KEY_FOLDER'], exist_ok=True)
+class SpooledRequest(Request):
+    """Request whose uploaded files stay in memory up to SPOOL_MAX_MEMORY
+
+    Larger files roll over to an anonymous temporary file in the system
+    temp directory, never into the upload folder.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config['SPOOL_MAX_MEMORY'], mode='rb+')
+
+app.request_class = SpooledRequest
+
+instrumentation.configure(app.config['METRICS_ENABLED'])
+jobs = JobManager(workers=app.config['JOB_WORKERS'], max_pending=app.config['JOB_MAX_PENDING'])
+prefetch_executor = ThreadPoolExecutor(max_workers=app.config['PCM_PREFETCH_WORKERS'],
+                                       thread_name_prefix='pcm-prefetch')
+
+# Created by init_runtime() on the first request that needs them
+key_pool = None
+key_registry = None
+transform_cache = None
+runtime_lock = threading.Lock()
+
+# Endpoints served without loading the audio and crypto stack
+LIGHTWEIGHT_ENDPOINTS = {'static', 'index', 'healthz', 'metrics', 'job_status', 'download', 'download_key',
+                         'storage_stats'}
+
+# Uploads deduplicated by content hash: hash -> [filename, pending /encrypt references]
+uploads_by_hash = {}
+uploads_lock = threading.Lock()
+
+def forget_upload(path):
+    """Drop dedup and PCM cache entries of a file deleted by the storage sweeper"""
+    filename = os.path.basename(path)
+    with uploads_lock:
+        for digest, entry in list(uploads_by_hash.items()):
+            if entry[0] == filename:
+                del uploads_by_hash[digest]
+    if key_pool is not None:
+        stego.evict_cached_audio(path)
+
+# Creates the directories and removes files left behind by a previous process that have expired
+storage = StorageManager([app.config['UPLOAD_FOLDER'], app.config['KEY_FOLDER']],
+                         quota=app.config['STORAGE_QUOTA'],
+                         ttl=app.config['STORAGE_TTL'],
+                         sweep_interval=app.config['STORAGE_SWEEP_INTERVAL'],
+                         on_remove=forget_upload)
+
+def init_runtime():
+    """Configure the transform backend and create the key pool and transform cache
+
+    Runs once per process; importing the heavy modules happens here.
+    """
+    global key_pool, key_registry, transform_cache
+    with runtime_lock:
+        if key_pool is not None:
+            return
+        transform.configure(app.config['TRANSFORM_BACKEND'], workers=app.config['TRANSFORM_WORKERS'])
+        transform_cache = transform_cache_module.TransformCache(
+            memory_budget=app.config['TRANSFORM_CACHE_MEMORY'],
+            disk_budget=app.config['TRANSFORM_CACHE_DISK'],
+            disk_dir=app.config['TRANSFORM_CACHE_FOLDER'])
+        stego.configure_transform_cache(transform_cache)
+        encryptor.configure_key_cache(app.config['KEY_CACHE_SIZE'])
+        key_registry = keyregistry.KeyRegistry(app.config['KEY_REGISTRY_FOLDER'])
+        key_pool = keypool.KeyPool(app.config['RSA_KEY_SIZE'],
+                                   target_size=app.config['KEY_POOL_SIZE'],
+                                   low_water=app.config['KEY_POOL_LOW_WATER'])
+
+def warmup(start_key_pool=False):
+    """Load everything a request needs ahead of time
+
+    Meant for the master process of a pre-forking server (for example a
+    gunicorn ``when_ready`` hook): modules are imported, the transform
+    backend is configured and exercised once, and the key pool is created,
+    so forked workers start warm. Keys generated before a fork are discarded
+    by the children, so the pool is only filled when start_key_pool is True
+    (single-process servers, or a ``post_fork`` hook in each worker).
+    """
+    start = time.perf_counter()
+    init_runtime()
+    import numpy as np
+    transform.dct(np.zeros((1, stego.FRAME_SIZE)), norm='ortho', axis=-1)
+    if start_key_pool:
+        key_pool.start()
+    logging.info(f"Warmup selesai dalam {time.perf_counter() - start:.3f} detik")
+
+def channel_mode():
+    """Stego channel mode constant for the configured STEGO_CHANNEL_MODE"""
+    return getattr(stego, f"CHANNEL_MODE_{app.config['STEGO_CHANNEL_MODE'].upper()}")
 
 def allowed_file(filename):
     """Check if the file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def temp_audio_path(filename, directory=None):
+    """Path sementara yang unik dengan ekstensi asli file unggahan
+
+    Raises:
+        ValueError: Jika ekstensi file tidak didukung
+    """
+    if not allowed_file(filename or ''):
+        raise ValueError(f"Format audio tidak didukung: {filename}")
+    extension = filename.rsplit('.', 1)[1].lower()
+    return os.path.join(directory or app.config['UPLOAD_FOLDER'], f"temp_{uuid.uuid4()}.{extension}")
+
 def cleanup():
     """Clean up upload directories when app exits"""
     try:
@@ -38,6 +198,260 @@ def cleanup():
 
 atexit.register(cleanup)
 
+def register_upload(audio_path):
+    """Deduplicate a freshly saved upload by content hash
+
+    If an identical file is already waiting in the upload folder, the new
+    copy is removed and the existing file is reused.
+
+    Returns:
+        Filename to use for this upload
+    """
+    with span('upload.hash'):
+        digest = transform_cache_module.content_hash(audio_path)
+    filename = os.path.basename(audio_path)
+    with uploads_lock:
+        entry = uploads_by_hash.get(digest)
+        if entry and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], entry[0])):
+            os.remove(audio_path)
+            entry[1] += 1
+            return entry[0]
+        uploads_by_hash[digest] = [filename, 1]
+        return filename
+
+def release_upload(audio_path):
+    """Drop one reference to an upload and delete it once nothing refers to it"""
+    filename = os.path.basename(audio_path)
+    with uploads_lock:
+        for digest, entry in list(uploads_by_hash.items()):
+            if entry[0] == filename:
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                del uploads_by_hash[digest]
+                break
+    stego.evict_cached_audio(audio_path)
+    storage.remove(audio_path)
+
+def prefetch_audio(audio_path):
+    """Decode an upload into the PCM cache in the background for /encrypt
+
+    Skipped when the embed will take the sparse path, which never reads the
+    PCM cache. Decodes run on a small executor and stego.cache_audio checks
+    its byte budget first, so a burst of uploads cannot start unbounded
+    decodes.
+    """
+    if app.config['STEGO_SPARSE_OUTPUT'] and stego.uses_sparse_output(
+            audio_path, stego_output_filename(audio_path),
+            app.config['STEGO_OUTPUT_FORMAT'], app.config['STEGO_OUTPUT_SUBTYPE']):
+        return
+    prefetch_executor.submit(stego.cache_audio, audio_path)
+
+def parse_recipients(value):
+    """Validate the number of recipients requested by a form field
+
+    Raises:
+        ValueError: If the value is not a number between 1 and MAX_RECIPIENTS
+    """
+    try:
+        recipients = int(value or 1)
+    except ValueError:
+        raise ValueError('Number of recipients must be a number')
+    if not 1 <= recipients <= app.config['MAX_RECIPIENTS']:
+        raise ValueError(f"Number of recipients must be between 1 and {app.config['MAX_RECIPIENTS']}")
+    return recipients
+
+def parse_recipient_ids(values):
+    """Collect registered recipient key ids from form fields
+
+    Each field may hold several ids separated by commas or whitespace;
+    duplicates are dropped.
+
+    Raises:
+        ValueError: If more than MAX_RECIPIENTS ids are given
+    """
+    key_ids = []
+    for value in values:
+        for key_id in value.replace(',', ' ').split():
+            if key_id.lower() not in key_ids:
+                key_ids.append(key_id.lower())
+    if len(key_ids) > app.config['MAX_RECIPIENTS']:
+        raise ValueError(f"At most {app.config['MAX_RECIPIENTS']} recipients are allowed")
+    return key_ids
+
+def recipient_keys(recipients=1, recipient_ids=None, progress=None):
+    """Public keys to encrypt for: registered keys, or fresh key pairs from the pool
+
+    Returns:
+        Tuple (list of generated (private_key, public_key) pairs, list of
+        public keys); no pairs are generated when recipient_ids are given
+
+    Raises:
+        ValueError: If a recipient id is not registered
+    """
+    if recipient_ids:
+        return [], key_registry.resolve(recipient_ids)
+    
+    # Take RSA key pairs from the pre-generated pool
+    key_pairs = []
+    for index in range(recipients):
+        if progress:
+            progress('keygen', index, recipients)
+        with span('keypool.get'):
+            key_pairs.append(key_pool.get())
+    if progress:
+        progress('keygen', recipients, recipients)
+    return key_pairs, [public_key for _, public_key in key_pairs]
+
+def stego_output_filename(audio_path):
+    """Filename for the stego output of an upload
+
+    Identical uploads share one file (see register_upload), so the name is
+    unique per request rather than derived from the upload's name; otherwise
+    a second embed into the same upload would overwrite the first output.
+    """
+    output_format = app.config['STEGO_OUTPUT_FORMAT']
+    if output_format:
+        extension = stego.FORMAT_EXTENSIONS[output_format.upper()]
+    else:
+        extension = os.path.splitext(audio_path)[1]
+    return f"encrypted_{uuid.uuid4()}{extension}"
+
+def embed_secret(message, audio_path, progress=None, recipients=1, recipient_ids=None):
+    """Encrypt a message for its recipients and embed it into an uploaded audio file
+
+    With several recipients, one envelope carries the AES key wrapped for each
+    key pair, so the audio is decoded, transformed and encoded only once and
+    every private key can recover the message from the same output file.
+
+    When recipient_ids are given, the message is encrypted for those
+    registered public keys (see POST /keys) and no key pairs are generated;
+    the recipients already hold their private keys.
+
+    Args:
+        message: Plaintext message
+        audio_path: Path to the uploaded temporary audio file (removed on success)
+        progress: Optional callback progress(stage, done, total)
+        recipients: Number of key pairs (one private key file each), ignored
+            when recipient_ids are given
+        recipient_ids: Optional list of registered public key ids
+
+    Returns:
+        Tuple (encrypted bytes, output audio filename, list of private key
+        filenames (empty for registered recipients), output size report from
+        stego.output_size_report)
+
+    Raises:
+        ValueError: If a recipient id is unknown, the message does not fit or embedding fails
+    """
+    key_pairs, public_keys = recipient_keys(recipients, recipient_ids, progress)
+    
+    # Encrypt message with an AES-256-GCM key wrapped by RSA-OAEP for every recipient
+    encrypted_bytes = encryptor.encrypt_envelope(message.encode('utf-8'), public_keys)
+    
+    # Check audio capacity
+    capacity = stego.calculate_max_capacity_framed(audio_path, channel_mode=channel_mode())
+    if len(encrypted_bytes) * 8 > capacity:
+        raise ValueError(f'Message too long. Max capacity: {capacity} bits')
+    
+    # Embed message into audio
+    output_format = app.config['STEGO_OUTPUT_FORMAT']
+    output_filename = stego_output_filename(audio_path)
+    output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
+    
+    # Keep the upload and the output being written away from the storage sweeper
+    with storage.pinned(audio_path), storage.pinned(output_path):
+        if not stego.embed_bytes_framed(audio_path, encrypted_bytes, output_path,
+                                        channel_mode=channel_mode(), progress=progress,
+                                        format=output_format,
+                                        subtype=app.config['STEGO_OUTPUT_SUBTYPE'],
+                                        compression_level=app.config['STEGO_FLAC_COMPRESSION'],
+                                        sparse=app.config['STEGO_SPARSE_OUTPUT']):
+            raise ValueError('Failed to embed message into audio')
+        storage.add(output_path)
+    size_report = stego.output_size_report(audio_path, output_path)
+    
+    # Save private key
+    private_key_files = []
+    for private_key, _ in key_pairs:
+        private_key_file = f"{uuid.uuid4()}_private.pem"
+        private_key_path = os.path.join(app.config['KEY_FOLDER'], private_key_file)
+        with span('key.save'), open(private_key_path, 'wb') as f:
+            f.write(private_key)
+        storage.add(private_key_path)
+        private_key_files.append(private_key_file)
+    
+    # Remove temporary audio file
+    release_upload(audio_path)
+    
+    return encrypted_bytes, output_filename, private_key_files, size_report
+
+def extract_secret(audio_path, private_key, progress=None):
+    """Ekstrak dan dekripsi pesan yang tersembunyi di file audio
+
+    Args:
+        audio_path: Path ke file audio
+        private_key: Kunci privat dalam format PEM bytes; kunci dan cipher
+            OAEP-nya diambil dari cache kunci encryptor sehingga tidak
+            di-parse ulang untuk setiap file
+        progress: Callback opsional progress(stage, done, total)
+
+    Returns:
+        Pesan hasil dekripsi dalam bentuk bytes
+
+    Raises:
+        ValueError: Jika pesan tidak ditemukan atau dekripsi gagal
+    """
+    # Validasi kunci sebelum memproses audio
+    encryptor.load_private_key(private_key)
+    
+    # Mode framed: envelope hybrid dengan header stego
+    payload = stego.extract_bytes_framed(audio_path, progress=progress)
+    if payload and encryptor.is_envelope(payload):
+        return encryptor.decrypt_envelope(payload, private_key)
+    
+    # Mode legacy: satu blok RSA-OAEP pada seluruh file
+    ciphertext = stego.extract_bytes_dct(audio_path)
+    if not ciphertext:
+        raise ValueError('Tidak ditemukan pesan dalam file audio')
+    return encryptor.decrypt_block(ciphertext, private_key)
+
+@app.before_request
+def ensure_runtime():
+    """Load the audio and crypto stack on the first request that needs it"""
+    if request.endpoint not in LIGHTWEIGHT_ENDPOINTS:
+        init_runtime()
+
+@app.before_request
+def start_storage_sweeper():
+    """Start the storage sweeper in this process (after a fork it runs in each worker)"""
+    storage.start()
+
+@app.before_request
+def start_request_trace():
+    """Start timing the request; stage spans recorded while handling it are attached to its log line"""
+    if instrumentation.is_enabled() and request.endpoint not in ('metrics', 'static', 'healthz'):
+        g.request_start = time.perf_counter()
+        g.trace = instrumentation.start_trace(method=request.method, path=request.path,
+                                              endpoint=request.endpoint)
+
+@app.after_request
+def record_request_status(response):
+    g.status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_trace(exc):
+    """Record request duration and write the structured request log"""
+    token = g.pop('trace', None)
+    if token is None:
+        return
+    status = g.pop('status', 500)
+    labels = {'endpoint': request.endpoint or 'unknown', 'status': str(status)}
+    instrumentation.finish_trace(token, status=status)
+    instrumentation.observe(instrumentation.REQUEST_SECONDS, time.perf_counter() - g.request_start, **labels)
+    instrumentation.inc('http_requests_total', **labels)
+
 @app.route('/')
 def index():
     """Home page for encryption"""
@@ -59,11 +473,21 @@ def upload_audio():
     # Save temporary file
     filename = secure_filename(f"temp_{uuid.uuid4()}.{audio_file.filename.rsplit('.', 1)[1].lower()}")
     audio_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    audio_file.save(audio_path)
+    with span('upload.save'), storage.pinned(audio_path):
+        audio_file.save(audio_path)
+    instrumentation.inc('audio_bytes_total', os.path.getsize(audio_path), operation='upload')
+    
+    # Reuse an identical upload if one is already waiting
+    filename = register_upload(audio_path)
+    audio_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not storage.add(audio_path):
+        release_upload(audio_path)
+        return {'error': 'Server storage is full, please try again later'}, 507
     
-    # Calculate maximum capacity
+    # Calculate maximum capacity (header only) and decode PCM in the background for /encrypt
     try:
-        capacity = calculate_max_capacity_dct(audio_path)
+        capacity = stego.calculate_max_capacity_framed(audio_path, channel_mode=channel_mode())
+        prefetch_audio(audio_path)
         return {
             'filename': filename,
             'capacity': capacity,
@@ -83,48 +507,94 @@ def encrypt():
             flash('Please provide both message and audio file', 'error')
             return redirect(url_for('index'))
         
-        audio_path = os.path.join(app.config['UPLOAD_FOLDER'], audio_filename)
-        
-        # Generate RSA 2048-bit key pair
-        private_key, public_key = generate_keys()
-        key_id = str(uuid.uuid4())
-        private_key_path = os.path.join(app.config['KEY_FOLDER'], f"{key_id}_private.pem")
-        
-        # Save private key
-        with open(private_key_path, 'wb') as f:
-            f.write(private_key)
-        
-        # Encrypt message with RSA-OAEP
-        encrypted_bytes = encrypt_message(message, public_key, as_bytes=True)
-        message_bits = ''.join(format(byte, '08b') for byte in encrypted_bytes)
-        
-        # Check audio capacity
-        capacity = calculate_max_capacity_dct(audio_path)
-        if len(message_bits) > capacity:
-            flash(f'Message too long. Max capacity: {capacity} bits', 'error')
-            return redirect(url_for('index'))
-        
-        # Embed message into audio
-        output_filename = f"encrypted_{audio_filename}"
-        output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
-        
-        if not embed_message_dct(audio_path, message_bits, output_path):
-            flash('Failed to embed message into audio', 'error')
-            return redirect(url_for('index'))
-        
-        # Remove temporary audio file
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+        audio_path = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(audio_filename))
+        recipients = parse_recipients(request.form.get('recipients'))
+        recipient_ids = parse_recipient_ids(request.form.getlist('recipient_ids'))
+        encrypted_bytes, output_filename, private_key_files, size_report = embed_secret(
+            message, audio_path, recipients=recipients, recipient_ids=recipient_ids)
         
         return render_template('embed_result.html',
                              encrypted_message=base64.b64encode(encrypted_bytes).decode(),
                              audio_path=output_filename,
-                             private_key_file=f"{key_id}_private.pem")
+                             private_key_files=private_key_files,
+                             recipient_ids=recipient_ids,
+                             size_report=size_report)
     
     except Exception as e:
         flash(f'Error: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/api/encrypt', methods=['POST'])
+def api_encrypt():
+    """Encrypt and embed in one request, streaming the stego audio back as the response body
+
+    Takes the same form fields as /encrypt, but with the audio in the
+    multipart field audio_file. Nothing is written to the upload or key
+    folders: the upload and the encoded output live in spooled buffers
+    (in memory up to SPOOL_MAX_MEMORY). Metadata is sent in headers:
+    X-Private-Key-<n> (base64 PEM, one per generated key pair; none when
+    recipient_ids are given), X-Recipient-Ids, X-Ciphertext-Length,
+    X-Ciphertext-SHA256, X-Audio-Format and X-Input-Bytes.
+    """
+    message = request.form.get('message')
+    audio_file = request.files.get('audio_file')
+    if not message or not audio_file or not audio_file.filename:
+        return {'error': 'Please provide both message and audio file'}, 400
+    if not allowed_file(audio_file.filename):
+        return {'error': 'Only WAV and FLAC files are supported'}, 400
+    
+    try:
+        recipients = parse_recipients(request.form.get('recipients'))
+        recipient_ids = parse_recipient_ids(request.form.getlist('recipient_ids'))
+        key_pairs, public_keys = recipient_keys(recipients, recipient_ids)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    encrypted_bytes = encryptor.encrypt_envelope(message.encode('utf-8'), public_keys)
+    
+    source = audio_file.stream
+    capacity = stego.calculate_max_capacity_framed(source, channel_mode=channel_mode())
+    if len(encrypted_bytes) * 8 > capacity:
+        return {'error': f'Message too long. Max capacity: {capacity} bits'}, 400
+    
+    output = tempfile.SpooledTemporaryFile(max_size=app.config['SPOOL_MAX_MEMORY'])
+    if not stego.embed_bytes_framed(source, encrypted_bytes, output,
+                                    channel_mode=channel_mode(),
+                                    format=app.config['STEGO_OUTPUT_FORMAT'],
+                                    subtype=app.config['STEGO_OUTPUT_SUBTYPE'],
+                                    compression_level=app.config['STEGO_FLAC_COMPRESSION']):
+        output.close()
+        return {'error': 'Failed to embed message into audio'}, 500
+    size_report = stego.output_size_report(source, output)
+    audio_file.close()
+    instrumentation.inc('audio_bytes_total', size_report['input_bytes'], operation='api_encrypt')
+    
+    stem = secure_filename(os.path.splitext(audio_file.filename)[0]) or 'audio'
+    output_filename = f"encrypted_{stem}{stego.FORMAT_EXTENSIONS[size_report['format']]}"
+    headers = {
+        'Content-Disposition': f'attachment; filename="{output_filename}"',
+        'Content-Length': str(size_report['output_bytes']),
+        'X-Audio-Format': f"{size_report['format']} {size_report['subtype']}",
+        'X-Input-Bytes': str(size_report['input_bytes']),
+        'X-Ciphertext-Length': str(len(encrypted_bytes)),
+        'X-Ciphertext-SHA256': hashlib.sha256(encrypted_bytes).hexdigest(),
+    }
+    if recipient_ids:
+        headers['X-Recipient-Ids'] = ','.join(recipient_ids)
+    for index, (private_key, _) in enumerate(key_pairs, 1):
+        headers[f'X-Private-Key-{index}'] = base64.b64encode(private_key).decode()
+    
+    chunk_size = app.config['API_STREAM_CHUNK']
+    
+    def generate():
+        try:
+            for chunk in iter(lambda: output.read(chunk_size), b''):
+                yield chunk
+        finally:
+            output.close()
+    
+    mimetype = mimetypes.guess_type(output_filename)[0] or 'application/octet-stream'
+    return app.response_class(generate(), mimetype=mimetype, headers=headers)
+
 @app.route('/decrypt', methods=['GET', 'POST'])
 def decrypt():
     """Halaman dan proses dekripsi"""
@@ -137,44 +607,22 @@ def decrypt():
                 flash('Harap unggah file audio dan kunci privat', 'error')
                 return redirect(url_for('decrypt'))
             
-            # Simpan file sementara
-            temp_audio = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{uuid.uuid4()}.flac")
-            audio_file.save(temp_audio)
-            
+            # Simpan file sementara dengan ekstensi aslinya
+            temp_audio = temp_audio_path(audio_file.filename)
+            storage.pin(temp_audio)
             try:
-                # Baca kunci privat
-                private_key = private_key_file.read()
-                priv_key = RSA.import_key(private_key)
-                
-                # Ekstrak pesan dari audio
-                bits = extract_message_dct(temp_audio)
-                if not bits:
-                    flash('Tidak ditemukan pesan dalam file audio', 'error')
-                    return redirect(url_for('decrypt'))
-                
-                # Pastikan panjang bit sesuai dengan kelipatan 8
-                if len(bits) % 8 != 0:
-                    bits = bits[:-(len(bits) % 8)]
-                
-                # Konversi bit ke byte
-                ciphertext = bytes(int(bits[i:i+8], 2) for i in range(0, len(bits), 8))
-                
-                # Verifikasi panjang ciphertext
-                key_size = priv_key.size_in_bytes()
-                if len(ciphertext) != key_size:
-                    flash(f'Panjang ciphertext tidak valid. Harus {key_size} bytes, dapat {len(ciphertext)} bytes', 'error')
-                    return redirect(url_for('decrypt'))
-                
-                # Dekripsi pesan
-                cipher = PKCS1_OAEP.new(priv_key, hashAlgo=SHA256)
-                decrypted = cipher.decrypt(ciphertext)
+                with span('upload.save'):
+                    audio_file.save(temp_audio)
+                storage.add(temp_audio)
+                instrumentation.inc('audio_bytes_total', os.path.getsize(temp_audio), operation='decrypt')
                 
+                # Baca kunci privat, lalu ekstrak dan dekripsi pesan
+                decrypted = extract_secret(temp_audio, private_key_file.read())
                 return render_template('decrypt_result.html', decrypted_message=decrypted.decode('utf-8'))
             
             finally:
                 # Hapus file sementara
-                if os.path.exists(temp_audio):
-                    os.remove(temp_audio)
+                storage.remove(temp_audio)
         
         except Exception as e:
             flash(f'Error dekripsi: {str(e)}', 'error')
@@ -182,17 +630,308 @@ def decrypt():
     
     return render_template('decrypt.html')
 
+def _encrypt_job(message, audio_path, recipients=1, recipient_ids=None, progress=None):
+    """Background job: encrypt and embed, returning file names for download"""
+    try:
+        with instrumentation.trace(job='encrypt'):
+            encrypted_bytes, output_filename, private_key_files, size_report = embed_secret(
+                message, audio_path, progress, recipients, recipient_ids)
+    finally:
+        # Pinned by submit_encrypt_job; a failed job leaves the upload to expire
+        storage.unpin(audio_path)
+    return {
+        'audio_file': output_filename,
+        'private_key_file': private_key_files[0] if private_key_files else None,
+        'private_key_files': private_key_files,
+        'recipient_ids': recipient_ids or [],
+        'encrypted_message': base64.b64encode(encrypted_bytes).decode(),
+        'output': size_report,
+    }
+
+def _decrypt_job(audio_path, private_key, progress=None):
+    """Background job: ekstrak dan dekripsi, file audio sementara dihapus setelahnya"""
+    try:
+        with instrumentation.trace(job='decrypt'):
+            return {'message': extract_secret(audio_path, private_key, progress).decode('utf-8')}
+    finally:
+        storage.remove(audio_path)
+
+def _submit_job(kind, func, *args):
+    """Queue a job and build the 202 response, or 503 when the queue is full"""
+    try:
+        job_id = jobs.submit(kind, func, *args)
+    except JobQueueFull as e:
+        return {'error': str(e)}, 503, {'Retry-After': '5'}
+    return {'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}, 202
+
+@app.route('/jobs/encrypt', methods=['POST'])
+def submit_encrypt_job():
+    """Queue encryption of an uploaded audio file (see /upload_audio)"""
+    message = request.form.get('message')
+    audio_filename = request.form.get('audio_filename')
+    if not message or not audio_filename:
+        return {'error': 'Please provide both message and audio file'}, 400
+    
+    try:
+        recipients = parse_recipients(request.form.get('recipients'))
+        recipient_ids = parse_recipient_ids(request.form.getlist('recipient_ids'))
+        key_registry.resolve(recipient_ids)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    
+    audio_path = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(audio_filename))
+    if not os.path.exists(audio_path):
+        return {'error': 'Audio file not found, please upload it again'}, 404
+    
+    storage.pin(audio_path)
+    response = _submit_job('encrypt', _encrypt_job, message, audio_path, recipients, recipient_ids)
+    if response[1] != 202:
+        storage.unpin(audio_path)
+    return response
+
+@app.route('/jobs/decrypt', methods=['POST'])
+def submit_decrypt_job():
+    """Antrekan proses dekripsi file audio"""
+    audio_file = request.files.get('audio_file_decrypt')
+    private_key_file = request.files.get('private_key_file')
+    if not audio_file or not private_key_file:
+        return {'error': 'Harap unggah file audio dan kunci privat'}, 400
+    
+    # Simpan file sementara; dihapus oleh job setelah selesai
+    try:
+        temp_audio = temp_audio_path(audio_file.filename)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    storage.pin(temp_audio)
+    with span('upload.save'):
+        audio_file.save(temp_audio)
+    storage.add(temp_audio)
+    instrumentation.inc('audio_bytes_total', os.path.getsize(temp_audio), operation='decrypt')
+    
+    response = _submit_job('decrypt', _decrypt_job, temp_audio, private_key_file.read())
+    if response[1] != 202:
+        storage.remove(temp_audio)
+    return response
+
+def _save_bulk_uploads(directory):
+    """Simpan file audio dari request /decrypt/bulk ke directory
+
+    File dapat dikirim sebagai beberapa field multipart 'audio_files' dan/atau
+    satu arsip zip di field 'archive'. File dengan ekstensi yang tidak
+    didukung dilewati.
+
+    Returns:
+        List tuple (nama file asli, path sementara)
+
+    Raises:
+        ValueError: Jika arsip tidak valid atau melebihi batas
+    """
+    saved = []
+    for audio_file in request.files.getlist('audio_files'):
+        if audio_file.filename and allowed_file(audio_file.filename):
+            path = temp_audio_path(audio_file.filename, directory)
+            audio_file.save(path)
+            saved.append((audio_file.filename, path))
+
+    archive = request.files.get('archive')
+    if archive and archive.filename:
+        try:
+            with zipfile.ZipFile(archive.stream) as bundle:
+                members = [info for info in bundle.infolist() if not info.is_dir() and allowed_file(info.filename)]
+                if len(saved) + len(members) > app.config['BULK_DECRYPT_MAX_FILES']:
+                    raise ValueError(f"Maksimal {app.config['BULK_DECRYPT_MAX_FILES']} file per request")
+                if sum(info.file_size for info in members) > app.config['BULK_DECRYPT_MAX_EXTRACTED']:
+                    raise ValueError("Isi arsip melebihi batas ukuran")
+                for info in members:
+                    # Nama anggota arsip hanya dipakai untuk laporan, bukan untuk path
+                    path = temp_audio_path(info.filename, directory)
+                    with bundle.open(info) as src, open(path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    saved.append((info.filename, path))
+        except zipfile.BadZipFile:
+            raise ValueError("Arsip bukan file zip yang valid")
+
+    if len(saved) > app.config['BULK_DECRYPT_MAX_FILES']:
+        raise ValueError(f"Maksimal {app.config['BULK_DECRYPT_MAX_FILES']} file per request")
+    return saved
+
+def _bulk_entry(name, audio_path, private_key):
+    """Ekstrak dan dekripsi satu file dari /decrypt/bulk; error dicatat di hasil"""
+    start = time.perf_counter()
+    result = {'file': name}
+    try:
+        # File sudah diproses BULK_DECRYPT_WORKERS sekaligus; satu thread transformasi per file
+        with transform.limit_workers(1):
+            message = extract_secret(audio_path, private_key)
+        try:
+            result.update(status='ok', message=message.decode('utf-8'))
+        except UnicodeDecodeError:
+            result.update(status='ok', message_base64=base64.b64encode(message).decode())
+    except Exception as e:
+        result.update(status='error', error=str(e))
+    finally:
+        os.remove(audio_path)
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+@app.route('/decrypt/bulk', methods=['POST'])
+def decrypt_bulk():
+    """Ekstrak dan dekripsi banyak file audio dengan satu kunci privat
+
+    Kunci privat di-parse sekali, file diproses paralel di thread pool, dan
+    hasil setiap file dikirim sebagai satu baris JSON (NDJSON) segera setelah
+    selesai. Baris terakhir berisi ringkasan dengan status 'done'.
+    """
+    private_key_file = request.files.get('private_key_file')
+    if not private_key_file:
+        return {'error': 'Harap unggah kunci privat'}, 400
+    # PEM bytes (bukan RsaKey) agar setiap file memakai kunci dan cipher dari cache kunci
+    private_key = private_key_file.read()
+    try:
+        encryptor.load_private_key(private_key)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    directory = tempfile.mkdtemp(prefix='bulk_', dir=app.config['UPLOAD_FOLDER'])
+    storage.pin(directory)
+    try:
+        with span('upload.save'):
+            uploads = _save_bulk_uploads(directory)
+    except ValueError as e:
+        storage.remove(directory)
+        return {'error': str(e)}, 400
+    if not uploads:
+        storage.remove(directory)
+        return {'error': 'Harap unggah file audio (field audio_files atau archive zip)'}, 400
+    storage.add(directory)
+    instrumentation.inc('audio_bytes_total', sum(os.path.getsize(path) for _, path in uploads),
+                        operation='decrypt_bulk')
+
+    def generate():
+        start = time.perf_counter()
+        counts = {'ok': 0, 'error': 0}
+        pool = ThreadPoolExecutor(max_workers=app.config['BULK_DECRYPT_WORKERS'])
+        try:
+            futures = [pool.submit(_bulk_entry, name, path, private_key) for name, path in uploads]
+            for future in as_completed(futures):
+                result = future.result()
+                counts[result['status']] += 1
+                instrumentation.inc('bulk_files_total', status=result['status'])
+                yield json.dumps(result) + '\n'
+            yield json.dumps({'status': 'done', 'files': len(uploads), **counts,
+                              'seconds': round(time.perf_counter() - start, 6)}) + '\n'
+        finally:
+            # Klien yang memutus koneksi membatalkan file yang belum mulai diproses
+            pool.shutdown(wait=True, cancel_futures=True)
+            storage.remove(directory)
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Job status with per-stage progress"""
+    job = jobs.get(job_id)
+    if job is None:
+        return {'error': 'Job not found'}, 404
+    
+    if job['status'] == 'done':
+        job['result_url'] = url_for('job_result', job_id=job_id)
+        if job['kind'] == 'encrypt' and job['result']['private_key_files']:
+            job['private_key_url'] = url_for('download_key', filename=job['result']['private_key_file'])
+            job['private_key_urls'] = [url_for('download_key', filename=filename)
+                                       for filename in job['result']['private_key_files']]
+    return job
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Download the stego audio of an encrypt job, or the message of a decrypt job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return {'error': 'Job not found'}, 404
+    if job['status'] != 'done':
+        return {'error': f"Job is {job['status']}", 'status': job['status']}, 409
+    
+    if job['kind'] == 'encrypt':
+        storage.touch(os.path.join(app.config['UPLOAD_FOLDER'], job['result']['audio_file']))
+        return send_from_directory(app.config['UPLOAD_FOLDER'], job['result']['audio_file'], as_attachment=True)
+    return job['result']
+
+@app.route('/keys', methods=['POST'])
+def register_key():
+    """Register a recipient public key (file field public_key_file or text field public_key)
+
+    Returns the key id to pass as recipient_ids to /encrypt and /jobs/encrypt;
+    registering the same key again returns the same id.
+    """
+    public_key_file = request.files.get('public_key_file')
+    public_key = public_key_file.read() if public_key_file else request.form.get('public_key', '').encode('utf-8')
+    if not public_key.strip():
+        return {'error': 'Please provide a public key'}, 400
+    try:
+        key_id, created = key_registry.register(public_key)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    info = key_registry.info(key_id)
+    return {'key_id': key_id, 'key_size': info['key_size'], 'created': created}, 201 if created else 200
+
+@app.route('/keys/<key_id>')
+def key_info(key_id):
+    """Registered public key by id"""
+    try:
+        return key_registry.info(key_id.lower())
+    except KeyError:
+        return {'error': 'Key not found'}, 404
+
+@app.route('/key_pool')
+def key_pool_stats():
+    """Key pool statistics (hits, misses, current size)"""
+    return key_pool.stats()
+
+@app.route('/transform_cache')
+def transform_cache_stats():
+    """Transform cache statistics (hits, misses, memory and disk usage)"""
+    return transform_cache.stats()
+
+@app.route('/storage')
+def storage_stats():
+    """Upload and key storage statistics (usage, quota, expired and evicted files)"""
+    return storage.stats()
+
+@app.route('/healthz')
+def healthz():
+    """Liveness check that does not load the audio and crypto stack"""
+    return {'status': 'ok', 'warm': key_pool is not None}
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: stage timings, byte counters, key pool and transform cache statistics"""
+    gauges = []
+    if key_pool is not None:
+        for name, value in key_pool.stats().items():
+            gauges.append((f'key_pool_{name}', f'Key pool {name}', value, {}))
+    if transform_cache is not None:
+        for name, value in transform_cache.stats().items():
+            gauges.append((f'transform_cache_{name}', f'Transform cache {name}', value, {}))
+        for name, value in encryptor.key_cache_stats().items():
+            gauges.append((f'key_cache_{name}', f'Parsed key cache {name}', value, {}))
+    for name, value in storage.stats().items():
+        gauges.append((f'storage_{name}', f'Storage {name}', value, {}))
+    return instrumentation.render(gauges), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/download/<path:filename>')
 def download(filename):
     """Download endpoint for files"""
+    storage.touch(os.path.join(app.config['UPLOAD_FOLDER'], filename))
     directory = os.path.dirname(os.path.join(app.config['UPLOAD_FOLDER'], filename))
     return send_from_directory(directory, os.path.basename(filename), as_attachment=True)
 
 @app.route('/download_key/<path:filename>')
 def download_key(filename):
     """Download endpoint for keys"""
+    storage.touch(os.path.join(app.config['KEY_FOLDER'], filename))
     directory = os.path.dirname(os.path.join(app.config['KEY_FOLDER'], filename))
     return send_from_directory(directory, os.path.basename(filename), as_attachment=True)
 
 if __name__ == '__main__':
+    warmup(start_key_pool=True)
     app.run(debug=True)
\ No newline at end of file
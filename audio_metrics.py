@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+SEGMENT_SIZE = 2048
+SEGMENTS_PER_BLOCK = 32
+BLOCK_SIZE = SEGMENT_SIZE * SEGMENTS_PER_BLOCK
+
+# Batas SNR per segmen (dB) seperti yang umum dipakai pada segmental SNR,
+# agar segmen hening atau identik tidak mendominasi rata-rata
+SEGMENT_SNR_MIN = -10.0
+SEGMENT_SNR_MAX = 35.0
+SPECTRUM_FLOOR = 1e-12
+
+class _Accumulator:
+    """Akumulator per kanal yang diperbarui blok demi blok"""
+
+    def __init__(self, channels):
+        self.signal_energy = np.zeros(channels)
+        self.noise_energy = np.zeros(channels)
+        self.peak_error = np.zeros(channels)
+        self.segment_snr_sum = np.zeros(channels)
+        self.spectral_sum = np.zeros(channels)
+        self.segments = 0
+        self.samples = 0
+        self.window = np.hanning(SEGMENT_SIZE)[:, np.newaxis]
+
+    def update(self, original, stego):
+        """Tambahkan satu blok (sampel, kanal) ke statistik"""
+        error = original - stego
+        self.samples += len(original)
+        self.signal_energy += np.einsum('ij,ij->j', original, original)
+        self.noise_energy += np.einsum('ij,ij->j', error, error)
+        self.peak_error = np.maximum(self.peak_error, np.abs(error).max(axis=0))
+
+        # Segmen penuh saja; sisa di akhir file hanya masuk ke SNR global
+        segments = len(original) // SEGMENT_SIZE
+        if not segments:
+            return
+        length = segments * SEGMENT_SIZE
+        original = original[:length].reshape(segments, SEGMENT_SIZE, -1)
+        error = error[:length].reshape(segments, SEGMENT_SIZE, -1)
+        stego = stego[:length].reshape(segments, SEGMENT_SIZE, -1)
+
+        signal = np.einsum('ijk,ijk->ik', original, original)
+        noise = np.einsum('ijk,ijk->ik', error, error)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            snr = 10 * np.log10(signal / noise)
+        snr = np.nan_to_num(snr, nan=SEGMENT_SNR_MIN, posinf=SEGMENT_SNR_MAX, neginf=SEGMENT_SNR_MIN)
+        self.segment_snr_sum += np.clip(snr, SEGMENT_SNR_MIN, SEGMENT_SNR_MAX).sum(axis=0)
+
+        # Log-spectral distance per segmen: RMS selisih spektrum daya dalam dB
+        original_power = np.abs(np.fft.rfft(original * self.window, axis=1)) ** 2
+        stego_power = np.abs(np.fft.rfft(stego * self.window, axis=1)) ** 2
+        difference = 10 * (np.log10(original_power + SPECTRUM_FLOOR) - np.log10(stego_power + SPECTRUM_FLOOR))
+        self.spectral_sum += np.sqrt(np.mean(difference ** 2, axis=1)).sum(axis=0)
+        self.segments += segments
+
+    def result(self):
+        """Hitung metrik akhir per kanal"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            snr = 10 * np.log10(self.signal_energy / self.noise_energy)
+            total_snr = 10 * np.log10(self.signal_energy.sum() / self.noise_energy.sum())
+        segments = max(self.segments, 1)
+        channels = [{
+            'snr_db': float(snr[i]),
+            'segmental_snr_db': float(self.segment_snr_sum[i] / segments),
+            'peak_error': float(self.peak_error[i]),
+            'spectral_distortion_db': float(self.spectral_sum[i] / segments),
+        } for i in range(len(snr))]
+        return {
+            'snr_db': float(total_snr),
+            'segmental_snr_db': float(np.mean([c['segmental_snr_db'] for c in channels])),
+            'peak_error': float(self.peak_error.max()),
+            'spectral_distortion_db': float(np.mean([c['spectral_distortion_db'] for c in channels])),
+            'per_channel': channels,
+        }
+
+def compare_files(original_path, stego_path, block_size=BLOCK_SIZE):
+    """Hitung metrik kualitas audio stego terhadap audio asli dalam satu kali baca
+
+    Kedua file dibaca bersamaan blok demi blok sehingga pemakaian memori
+    tetap konstan berapa pun panjang file. Metrik yang dihitung untuk setiap
+    kanal: SNR global, segmental SNR, error puncak dan spectral distortion
+    (log-spectral distance).
+
+    Args:
+        original_path: Path ke file audio asli
+        stego_path: Path ke file audio stego
+        block_size: Jumlah sampel per blok, dibulatkan ke kelipatan SEGMENT_SIZE
+
+    Returns:
+        Dictionary berisi metrik gabungan dan per kanal
+
+    Raises:
+        ValueError: Jika sample rate atau jumlah kanal berbeda
+    """
+    block_size = max(SEGMENT_SIZE, block_size // SEGMENT_SIZE * SEGMENT_SIZE)
+    with sf.SoundFile(original_path) as original, sf.SoundFile(stego_path) as stego:
+        if original.samplerate != stego.samplerate:
+            raise ValueError("Sample rate berbeda antara original dan stego")
+        if original.channels != stego.channels:
+            raise ValueError("Jumlah kanal berbeda antara original dan stego")
+
+        accumulator = _Accumulator(original.channels)
+        while True:
+            a = original.read(block_size, dtype='float64', always_2d=True)
+            b = stego.read(block_size, dtype='float64', always_2d=True)
+            length = min(len(a), len(b))
+            if not length:
+                break
+            accumulator.update(a[:length], b[:length])
+
+        result = {
+            'original': original_path,
+            'stego': stego_path,
+            'samplerate': original.samplerate,
+            'channels': original.channels,
+            'samples': accumulator.samples,
+            'length_difference': stego.frames - original.frames,
+        }
+    result.update(accumulator.result())
+    return result
+
+def _compare_entry(pair):
+    """Bandingkan satu pasangan file; error dicatat di hasil, bukan dibuang"""
+    original_path, stego_path = pair
+    try:
+        return dict(compare_files(original_path, stego_path), status='ok')
+    except Exception as e:
+        return {'original': original_path, 'stego': stego_path, 'status': 'error', 'error': str(e)}
+
+def compare_corpus(pairs, workers=None):
+    """Hitung metrik untuk banyak pasangan file secara paralel di process pool
+
+    Args:
+        pairs: Iterable tuple (path asli, path stego)
+        workers: Jumlah proses (None = semua core)
+
+    Returns:
+        List hasil dengan urutan yang sama seperti pairs; pasangan yang gagal
+        memiliki status 'error' beserta pesannya
+    """
+    pairs = list(pairs)
+    if workers == 1 or len(pairs) <= 1:
+        return [_compare_entry(pair) for pair in pairs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_compare_entry, pairs))
+
+def _pairs_from_args(original, stego):
+    """Pasangan file dari dua path file, atau dua direktori dengan nama file yang sama"""
+    if not os.path.isdir(original):
+        return [(original, stego)]
+    pairs = []
+    for filename in sorted(os.listdir(original)):
+        stego_path = os.path.join(stego, filename)
+        if filename.lower().endswith(('.wav', '.flac')) and os.path.exists(stego_path):
+            pairs.append((os.path.join(original, filename), stego_path))
+    return pairs
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Metrik kualitas audio stego terhadap audio asli')
+    parser.add_argument('original', help='File atau direktori audio asli')
+    parser.add_argument('stego', help='File atau direktori audio stego (nama file sama)')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Jumlah proses worker')
+    parser.add_argument('-r', '--report', help='File laporan JSON-lines (default: stdout)')
+    return parser
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    results = compare_corpus(_pairs_from_args(args.original, args.stego), workers=args.workers)
+    output = open(args.report, 'w', encoding='utf-8') if args.report else sys.stdout
+    for result in results:
+        output.write(json.dumps(result) + '\n')
+    if args.report:
+        output.close()
+    sys.exit(1 if any(r['status'] == 'error' for r in results) else 0)
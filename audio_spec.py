@@ -1,55 +1,277 @@
+import argparse
+import json
 import os
-from pydub.utils import mediainfo
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import soundfile as sf
+
+import stego
+
+# Format yang dapat dibaca libsndfile (mp3 membutuhkan libsndfile >= 1.1)
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3', '.aiff', '.aif')
+DEFAULT_INDEX = os.path.join('cache', 'audio_index.sqlite')
+
+# Naikkan jika kolom atau rumus kapasitas berubah; indeks lama akan dibangun ulang
+INDEX_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    format TEXT,
+    subtype TEXT,
+    samplerate INTEGER,
+    channels INTEGER,
+    frames INTEGER,
+    duration REAL,
+    bitrate INTEGER,
+    frame_size INTEGER,
+    capacity_first_bits INTEGER,
+    capacity_spread_bits INTEGER,
+    error TEXT,
+    scanned_at REAL
+)
+"""
+_COLUMNS = ('path', 'mtime_ns', 'size', 'format', 'subtype', 'samplerate', 'channels', 'frames', 'duration',
+            'bitrate', 'frame_size', 'capacity_first_bits', 'capacity_spread_bits', 'error', 'scanned_at')
+
+def probe(path, mtime_ns, size, frame_size=stego.FRAME_SIZE):
+    """Baca header satu file audio di dalam proses dan hitung kapasitas stego
+
+    Args:
+        path: Path absolut file audio
+        mtime_ns: Waktu modifikasi file (nanodetik) saat di-stat
+        size: Ukuran file (bytes) saat di-stat
+        frame_size: Ukuran frame yang dipakai untuk menghitung kapasitas
+
+    Returns:
+        Dictionary satu baris indeks; kolom error terisi jika file tidak dapat dibaca
+    """
+    row = dict.fromkeys(_COLUMNS)
+    row.update(path=path, mtime_ns=mtime_ns, size=size, frame_size=frame_size, scanned_at=time.time())
+    try:
+        info = sf.info(path)
+        duration = info.frames / info.samplerate if info.samplerate else 0.0
+        row.update(
+            format=info.format,
+            subtype=info.subtype,
+            samplerate=info.samplerate,
+            channels=info.channels,
+            frames=info.frames,
+            duration=duration,
+            bitrate=int(size * 8 / duration) if duration else None,
+            capacity_first_bits=stego.framed_capacity(info.frames, info.channels, frame_size,
+                                                      stego.CHANNEL_MODE_FIRST),
+            capacity_spread_bits=stego.framed_capacity(info.frames, info.channels, frame_size,
+                                                       stego.CHANNEL_MODE_SPREAD),
+        )
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+def _walk(directory, recursive):
+    """Kumpulkan (path absolut, mtime_ns, size) semua file audio di directory"""
+    pending = [os.path.abspath(directory)]
+    while pending:
+        current = pending.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(entry.path)
+                elif entry.name.lower().endswith(AUDIO_EXTENSIONS) and entry.is_file():
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime_ns, stat.st_size
+
+class AudioIndex:
+    """Indeks metadata audio persisten di SQLite
+
+    Setiap baris menyimpan header audio (format, sample rate, kanal, durasi)
+    dan kapasitas stego yang sudah dihitung. Baris dianggap valid selama
+    mtime dan ukuran file tidak berubah, sehingga scan ulang hanya perlu
+    stat file dan membaca header file yang baru atau berubah.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX):
+        """
+        Args:
+            db_path: Path file SQLite (direktori dibuat jika belum ada)
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        if self._db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            self._db.execute('DROP TABLE IF EXISTS audio')
+            self._db.execute(f'PRAGMA user_version={INDEX_VERSION}')
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _rows_under(self, root):
+        """Baris indeks dengan path di bawah root: path -> (mtime_ns, size, frame_size)"""
+        prefix = root.rstrip(os.sep) + os.sep
+        cursor = self._db.execute('SELECT path, mtime_ns, size, frame_size FROM audio WHERE path >= ? AND path < ?',
+                                  (prefix, prefix + '\U0010ffff'))
+        return {row[0]: tuple(row[1:]) for row in cursor}
+
+    def scan(self, directory, recursive=True, workers=None, frame_size=stego.FRAME_SIZE):
+        """Perbarui indeks untuk semua file audio di directory
+
+        File yang mtime dan ukurannya sama dengan indeks dilewati, file baru
+        atau berubah dibaca header-nya secara paralel, dan baris untuk file
+        yang sudah dihapus ikut dibuang.
+
+        Args:
+            directory: Direktori yang dipindai
+            recursive: Jika True, telusuri subdirektori
+            workers: Jumlah thread pembaca header (None = bawaan ThreadPoolExecutor)
+            frame_size: Ukuran frame untuk kapasitas stego
+
+        Returns:
+            Dictionary berisi jumlah file yang diperbarui, tidak berubah, dihapus dan gagal
+
+        Raises:
+            FileNotFoundError: Jika directory tidak ada
+        """
+        start = time.perf_counter()
+        root = os.path.abspath(directory)
+        if not os.path.isdir(root):
+            raise FileNotFoundError(f"Folder {directory} tidak ditemukan")
+
+        known = self._rows_under(root)
+        seen = set()
+        stale = []
+        for path, mtime_ns, size in _walk(root, recursive):
+            seen.add(path)
+            if known.get(path) != (mtime_ns, size, frame_size):
+                stale.append((path, mtime_ns, size))
+
+        removed = [path for path in known if path not in seen
+                   and (recursive or os.path.dirname(path) == root)]
+
+        # Membaca header dominan I/O dan libsndfile melepas GIL, jadi thread sudah cukup
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(lambda item: probe(*item, frame_size=frame_size), stale))
+
+        with self._db:
+            self._db.executemany(f"INSERT OR REPLACE INTO audio ({', '.join(_COLUMNS)}) "
+                                 f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                                 [tuple(row[column] for column in _COLUMNS) for row in rows])
+            self._db.executemany('DELETE FROM audio WHERE path = ?', [(path,) for path in removed])
+
+        return {
+            'files': len(seen),
+            'updated': len(rows),
+            'unchanged': len(seen) - len(rows),
+            'removed': len(removed),
+            'errors': sum(1 for row in rows if row['error']),
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+
+    def get(self, path):
+        """Baris indeks untuk satu file, atau None jika belum diindeks"""
+        row = self._db.execute('SELECT * FROM audio WHERE path = ?', (os.path.abspath(path),)).fetchone()
+        return dict(row) if row else None
+
+    def entries(self, directory=None, recursive=True):
+        """Baris indeks urut berdasarkan path
+
+        Args:
+            directory: Jika diberikan, hanya file di bawah folder ini
+            recursive: Jika False, hanya file yang langsung berada di directory
+        """
+        if directory is None:
+            return [dict(row) for row in self._db.execute('SELECT * FROM audio ORDER BY path')]
+        root = os.path.abspath(directory)
+        prefix = root.rstrip(os.sep) + os.sep
+        cursor = self._db.execute('SELECT * FROM audio WHERE path >= ? AND path < ? ORDER BY path',
+                                  (prefix, prefix + '\U0010ffff'))
+        return [dict(row) for row in cursor if recursive or os.path.dirname(row['path']) == root]
+
+def read_audio_info(directory, index_path=DEFAULT_INDEX, recursive=False):
+    """Baca informasi file audio dalam folder melalui indeks
+
+    Args:
+        directory: Folder berisi file audio
+        index_path: Path indeks SQLite
+        recursive: Jika True, telusuri subdirektori
+
+    Returns:
+        List dictionary informasi setiap file audio yang dapat dibaca
+    """
+    with AudioIndex(index_path) as index:
+        index.scan(directory, recursive=recursive)
+        entries = index.entries(directory, recursive=recursive)
 
-# Fungsi untuk membaca informasi audio dalam folder
-def read_audio_info(directory):
-    # Daftar untuk menyimpan informasi file audio
     audio_info_list = []
-    
-    # Pastikan folder ada
-    if not os.path.exists(directory):
-        print(f"Folder {directory} tidak ditemukan!")
-        return
-    
-    # Loop untuk membaca file dalam folder
-    for filename in os.listdir(directory):
-        # Periksa jika file memiliki ekstensi audio yang valid (misalnya mp3, wav, dll.)
-        if filename.endswith(('.mp3', '.wav', '.flac', '.ogg', '.m4a')):
-            file_path = os.path.join(directory, filename)
-            
-            # Mendapatkan informasi dari file audio menggunakan pydub
-            info = mediainfo(file_path)
-            
-            # Mengonversi durasi dalam detik ke format menit dan detik
-            duration_seconds = float(info['duration'])
-            minutes = int(duration_seconds // 60)
-            seconds = int(duration_seconds % 60)
-            
-            # Menyimpan informasi dalam list
-            audio_info_list.append({
-                'File Name': filename,
-                'Duration': f"{minutes} menit {seconds} detik",
-                'Channels': int(info['channels']),
-                'Sample Rate': int(info['sample_rate']),
-                'Bitrate': info.get('bit_rate', 'N/A')
-            })
-    
+    for entry in entries:
+        if entry['error']:
+            continue
+        minutes, seconds = divmod(int(entry['duration']), 60)
+        audio_info_list.append({
+            'File Name': os.path.relpath(entry['path'], directory),
+            'Duration': f"{minutes} menit {seconds} detik",
+            'Channels': entry['channels'],
+            'Sample Rate': entry['samplerate'],
+            'Bitrate': entry['bitrate'] if entry['bitrate'] is not None else 'N/A',
+            'Capacity': entry['capacity_spread_bits'],
+        })
     return audio_info_list
 
-# Tentukan folder yang berisi file audio
-audio_folder = 'audio_files'
+def build_parser():
+    parser = argparse.ArgumentParser(description='Tampilkan spesifikasi dan kapasitas stego file audio')
+    parser.add_argument('directory', nargs='?', default='audio_files', help='Folder berisi file audio')
+    parser.add_argument('-i', '--index', default=DEFAULT_INDEX, help='Path indeks SQLite')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='Jumlah thread pembaca header')
+    parser.add_argument('--recursive', action='store_true', help='Telusuri subdirektori')
+    parser.add_argument('--json', action='store_true', help='Keluaran JSON-lines berisi seluruh kolom indeks')
+    return parser
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    try:
+        with AudioIndex(args.index) as index:
+            stats = index.scan(args.directory, recursive=args.recursive, workers=args.workers)
+            entries = index.entries(args.directory, recursive=args.recursive)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
 
-# Membaca dan menampilkan informasi
-audio_files_info = read_audio_info(audio_folder)
+    if args.json:
+        for entry in entries:
+            print(json.dumps(entry))
+        sys.exit(0)
 
-# Menampilkan informasi
-if audio_files_info:
-    for audio_info in audio_files_info:
-        print(f"File: {audio_info['File Name']}")
-        print(f"  Duration: {audio_info['Duration']}")
-        print(f"  Channels: {audio_info['Channels']}")
-        print(f"  Sample Rate: {audio_info['Sample Rate']} Hz")
-        print(f"  Bitrate: {audio_info['Bitrate']}")
+    for entry in entries:
+        print(f"File: {os.path.relpath(entry['path'], args.directory)}")
+        if entry['error']:
+            print(f"  Error: {entry['error']}")
+        else:
+            minutes, seconds = divmod(int(entry['duration']), 60)
+            print(f"  Duration: {minutes} menit {seconds} detik")
+            print(f"  Channels: {entry['channels']}")
+            print(f"  Sample Rate: {entry['samplerate']} Hz")
+            print(f"  Bitrate: {entry['bitrate'] or 'N/A'}")
+            print(f"  Format: {entry['format']} {entry['subtype']}")
+            print(f"  Kapasitas stego: {entry['capacity_first_bits']} bit (kanal pertama), "
+                  f"{entry['capacity_spread_bits']} bit (semua kanal)")
         print('-' * 40)
-else:
-    print("Tidak ada file audio yang ditemukan di folder tersebut.")
+    if not entries:
+        print("Tidak ada file audio yang ditemukan di folder tersebut.")
+    print(f"{stats['files']} file, {stats['updated']} diperbarui, {stats['unchanged']} tidak berubah, "
+          f"{stats['removed']} dihapus dari indeks, {stats['errors']} gagal ({stats['seconds']} detik)")
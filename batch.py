@@ -0,0 +1,246 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import stego
+import transform
+from audio_metrics import compare_files
+from encryptor import encrypt_envelope, decrypt_envelope, is_envelope
+
+AUDIO_EXTENSIONS = ('.wav', '.flac')
+CHANNEL_MODES = {'first': stego.CHANNEL_MODE_FIRST, 'spread': stego.CHANNEL_MODE_SPREAD}
+
+def collect_inputs(source, recursive=False):
+    """Kumpulkan daftar file audio dari direktori atau file manifest
+
+    Manifest berisi satu path per baris; baris boleh berisi path output
+    setelah karakter tab. Baris kosong dan baris yang diawali '#' diabaikan.
+    Path relatif di manifest dihitung dari lokasi manifest.
+
+    Args:
+        source: Path direktori atau file manifest
+        recursive: Jika True, telusuri subdirektori
+
+    Returns:
+        List tuple (path input, path output atau None)
+    """
+    if os.path.isdir(source):
+        entries = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith(AUDIO_EXTENSIONS):
+                    entries.append((os.path.join(root, filename), None))
+            if not recursive:
+                break
+        return entries
+
+    base = os.path.dirname(os.path.abspath(source))
+    entries = []
+    with open(source, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            parts = line.split('\t')
+            input_path = os.path.join(base, parts[0].strip())
+            output_path = os.path.join(base, parts[1].strip()) if len(parts) > 1 and parts[1].strip() else None
+            entries.append((input_path, output_path))
+    return entries
+
+def default_output_path(input_path, source, output_dir, command, output_format=None):
+    """Path output bawaan: struktur relatif input di dalam output_dir
+
+    Hasil embed memakai nama file yang sama (ekstensi mengikuti output_format
+    jika diberikan), hasil extract memakai akhiran .bin.
+    """
+    root = source if os.path.isdir(source) else os.path.dirname(os.path.abspath(source))
+    relative = os.path.relpath(os.path.abspath(input_path), os.path.abspath(root))
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(input_path)
+    if command == 'extract':
+        relative = os.path.splitext(relative)[0] + '.bin'
+    elif output_format:
+        relative = os.path.splitext(relative)[0] + stego.FORMAT_EXTENSIONS[output_format]
+    return os.path.join(output_dir, relative)
+
+def _partial_path(output_path):
+    """Path sementara di direktori yang sama, ekstensi dipertahankan untuk soundfile"""
+    directory, filename = os.path.split(output_path)
+    stem, ext = os.path.splitext(filename)
+    return os.path.join(directory, f".{stem}.partial{ext}")
+
+def _init_worker():
+    """Satu proses per file sudah memakai semua core, jadi kanal dan transformasi diproses serial"""
+    stego.CHANNEL_WORKERS = 1
+    transform.configure(transform.backend_info()['backend'], workers=1)
+
+def embed_file(input_path, output_path, payload, public_key=None, channel_mode=stego.CHANNEL_MODE_SPREAD,
+               frame_size=stego.FRAME_SIZE, metrics=False, output_format=None, subtype=None,
+               compression_level=None, sparse=False):
+    """Sisipkan payload ke satu file audio (dijalankan di worker)
+
+    Jika metrics True, metrik kualitas audio hasil dihitung di worker yang sama
+    dan disertakan di hasil. Format, subtype dan tingkat kompresi FLAC output
+    diteruskan ke stego.embed_bytes_framed (None = sama dengan input), begitu
+    juga sparse (salin file PCM lalu timpa frame payload saja).
+
+    Returns:
+        Dictionary hasil untuk laporan JSON-lines
+    """
+    start = time.perf_counter()
+    result = {'command': 'embed', 'input': input_path, 'output': output_path}
+    partial = _partial_path(output_path)
+    try:
+        data = encrypt_envelope(payload, public_key) if public_key else payload
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if not stego.embed_bytes_framed(input_path, data, partial, frame_size=frame_size,
+                                        channel_mode=channel_mode, format=output_format, subtype=subtype,
+                                        compression_level=compression_level, sparse=sparse):
+            raise ValueError("Gagal menyisipkan pesan (lihat log)")
+        os.replace(partial, output_path)
+        result.update(status='ok', payload_bytes=len(data), **stego.output_size_report(input_path, output_path))
+        if metrics:
+            quality = compare_files(input_path, output_path)
+            result['metrics'] = {key: quality[key] for key in
+                                 ('snr_db', 'segmental_snr_db', 'peak_error', 'spectral_distortion_db', 'per_channel')}
+    except Exception as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        result.update(status='error', error=str(e))
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+def extract_file(input_path, output_path, private_key=None):
+    """Ekstrak payload dari satu file audio (dijalankan di worker)
+
+    Returns:
+        Dictionary hasil untuk laporan JSON-lines
+    """
+    start = time.perf_counter()
+    result = {'command': 'extract', 'input': input_path, 'output': output_path}
+    try:
+        data = stego.extract_bytes_framed(input_path)
+        if data is None:
+            raise ValueError("Tidak ditemukan pesan dalam file audio")
+        if private_key:
+            if not is_envelope(data):
+                raise ValueError("Payload bukan envelope terenkripsi")
+            data = decrypt_envelope(data, private_key)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        partial = _partial_path(output_path)
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, output_path)
+        result.update(status='ok', payload_bytes=len(data))
+    except Exception as e:
+        result.update(status='error', error=str(e))
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+def run_batch(args):
+    """Jalankan embed/extract untuk semua input di process pool
+
+    Output yang sudah ada dilewati (resumable), dan setiap hasil langsung
+    ditambahkan ke laporan JSON-lines.
+
+    Returns:
+        Jumlah file yang gagal
+    """
+    entries = collect_inputs(args.input, recursive=args.recursive)
+    jobs = []
+    output_format = getattr(args, 'format', None)
+    for input_path, output_path in entries:
+        output_path = output_path or default_output_path(input_path, args.input, args.output_dir, args.command,
+                                                         output_format)
+        jobs.append((input_path, output_path))
+
+    if args.command == 'embed':
+        with open(args.payload, 'rb') as f:
+            payload = f.read()
+        public_key = [open(path, 'rb').read() for path in args.public_key] if args.public_key else None
+    else:
+        private_key = open(args.private_key, 'rb').read() if args.private_key else None
+
+    report = open(args.report, 'a', encoding='utf-8') if args.report else None
+    counts = {'ok': 0, 'error': 0, 'skipped': 0}
+    batch_start = time.perf_counter()
+
+    def record(result):
+        counts[result['status']] += 1
+        if report:
+            report.write(json.dumps(result) + '\n')
+            report.flush()
+        if result['status'] == 'error':
+            print(f"[ERROR] {result['input']}: {result['error']}", file=sys.stderr)
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            futures = []
+            for input_path, output_path in jobs:
+                if not args.overwrite and os.path.exists(output_path):
+                    record({'command': args.command, 'input': input_path, 'output': output_path,
+                            'status': 'skipped', 'seconds': 0.0})
+                    continue
+                if args.command == 'embed':
+                    futures.append(pool.submit(embed_file, input_path, output_path, payload, public_key,
+                                               CHANNEL_MODES[args.channel_mode], args.frame_size, args.metrics,
+                                               args.format, args.subtype, args.compression_level, args.sparse))
+                else:
+                    futures.append(pool.submit(extract_file, input_path, output_path, private_key))
+
+            for future in as_completed(futures):
+                record(future.result())
+    finally:
+        if report:
+            report.close()
+
+    elapsed = time.perf_counter() - batch_start
+    print(f"Selesai dalam {elapsed:.2f} detik: {counts['ok']} berhasil, "
+          f"{counts['skipped']} dilewati, {counts['error']} gagal")
+    return counts['error']
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Embed/extract steganografi audio secara batch')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(sub):
+        sub.add_argument('input', help='Direktori audio atau file manifest (satu path per baris, opsional "\\t<output>")')
+        sub.add_argument('-o', '--output-dir', default='batch_output', help='Direktori output bawaan')
+        sub.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Jumlah proses worker')
+        sub.add_argument('-r', '--report', help='File laporan JSON-lines (ditambahkan, tidak ditimpa)')
+        sub.add_argument('--recursive', action='store_true', help='Telusuri subdirektori input')
+        sub.add_argument('--overwrite', action='store_true', help='Proses ulang meskipun output sudah ada')
+
+    embed = subparsers.add_parser('embed', help='Sisipkan payload ke setiap file audio')
+    add_common(embed)
+    embed.add_argument('-p', '--payload', required=True, help='File payload yang akan disisipkan')
+    embed.add_argument('-k', '--public-key', action='append',
+                       help='Kunci publik PEM; payload dienkripsi dengan envelope hybrid. '
+                            'Ulangi untuk banyak penerima dalam satu envelope')
+    embed.add_argument('--channel-mode', choices=sorted(CHANNEL_MODES), default='spread')
+    embed.add_argument('--frame-size', type=int, default=stego.FRAME_SIZE)
+    embed.add_argument('--metrics', action='store_true', help='Sertakan metrik kualitas audio (SNR, dll.) di laporan')
+    embed.add_argument('--format', type=str.upper, choices=stego.OUTPUT_FORMATS,
+                       help='Format output (bawaan: sama dengan input)')
+    embed.add_argument('--subtype', type=str.upper, choices=stego.OUTPUT_SUBTYPES,
+                       help='Subtype/bit depth output (bawaan: sama dengan input)')
+    embed.add_argument('--compression-level', type=float, help='Tingkat kompresi FLAC 0.0-1.0')
+    embed.add_argument('--sparse', action='store_true',
+                       help='Untuk WAV/AIFF/W64/RF64 tanpa ganti format: salin file (reflink jika didukung) '
+                            'dan timpa hanya frame yang memuat payload')
+
+    extract = subparsers.add_parser('extract', help='Ekstrak payload dari setiap file audio')
+    add_common(extract)
+    extract.add_argument('-k', '--private-key', help='Kunci privat PEM untuk mendekripsi envelope')
+
+    return parser
+
+if __name__ == '__main__':
+    # Kegagalan per file sudah dicatat di laporan; log hanya untuk peringatan
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(1 if run_batch(build_parser().parse_args()) else 0)
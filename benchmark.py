@@ -0,0 +1,240 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+import soundfile as sf
+from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+
+import stego
+import transform
+from encryptor import generate_keys
+
+SUBTYPES = {16: 'PCM_16', 24: 'PCM_24', 32: 'PCM_32'}
+PERCENTILES = (50, 90, 99)
+
+def synth_audio(duration, samplerate, channels, seed=0):
+    """Bangkitkan audio sintetis (nada + noise) di memori
+
+    Args:
+        duration: Durasi dalam detik
+        samplerate: Sample rate dalam Hz
+        channels: Jumlah kanal
+        seed: Seed generator acak agar hasil dapat direproduksi
+
+    Returns:
+        Array float32 (sampel, kanal)
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * samplerate), dtype=np.float32) / samplerate
+    data = np.empty((len(t), channels), dtype=np.float32)
+    for channel in range(channels):
+        tone = 0.3 * np.sin(2 * np.pi * (220 + 55 * channel) * t, dtype=np.float32)
+        data[:, channel] = tone + 0.05 * rng.standard_normal(len(t), dtype=np.float32)
+    return data
+
+def measure(func, repeat, warmup):
+    """Ukur waktu eksekusi func dan puncak memori yang dialokasikan
+
+    Waktu diukur tanpa tracemalloc; puncak memori diukur pada satu
+    eksekusi tambahan dengan tracemalloc aktif (alokasi NumPy ikut tercatat).
+
+    Returns:
+        Dictionary berisi statistik waktu (detik) dan peak_memory_bytes
+    """
+    for _ in range(warmup):
+        func()
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    times = np.array(times)
+    stats = {'repeat': repeat, 'warmup': warmup, 'mean': float(times.mean()),
+             'min': float(times.min()), 'max': float(times.max())}
+    for p in PERCENTILES:
+        stats[f'p{p}'] = float(np.percentile(times, p))
+    stats['peak_memory_bytes'] = int(peak)
+    return stats
+
+def bench_audio(workdir, duration, samplerate, bit_depth, channels, repeat, warmup, public_key):
+    """Benchmark fungsi stego untuk satu kombinasi parameter audio
+
+    Returns:
+        List hasil benchmark
+    """
+    params = {'duration': duration, 'samplerate': samplerate, 'bit_depth': bit_depth, 'channels': channels}
+    name = f"{duration}s_{samplerate}hz_{bit_depth}bit_{channels}ch"
+    source = os.path.join(workdir, f"{name}.wav")
+    legacy_out = os.path.join(workdir, f"{name}_legacy.wav")
+    framed_out = os.path.join(workdir, f"{name}_framed.wav")
+
+    sf.write(source, synth_audio(duration, samplerate, channels), samplerate, subtype=SUBTYPES[bit_depth])
+
+    # Satu blok RSA-OAEP seperti yang disisipkan mode legacy
+    ciphertext = PKCS1_OAEP.new(RSA.import_key(public_key), hashAlgo=SHA256).encrypt(b'benchmark')
+    message_bits = ''.join(format(byte, '08b') for byte in ciphertext)
+    stego.embed_message_dct(source, message_bits, legacy_out)
+    stego.embed_bytes_framed(source, ciphertext, framed_out, channel_mode=stego.CHANNEL_MODE_SPREAD)
+
+    cases = [
+        ('calculate_max_capacity_dct', lambda: stego.calculate_max_capacity_dct(source)),
+        ('embed_message_dct', lambda: stego.embed_message_dct(source, message_bits, legacy_out)),
+        ('extract_message_dct', lambda: stego.extract_message_dct(legacy_out)),
+        ('calculate_max_capacity_framed', lambda: stego.calculate_max_capacity_framed(
+            source, channel_mode=stego.CHANNEL_MODE_SPREAD)),
+        ('embed_bytes_framed', lambda: stego.embed_bytes_framed(
+            source, ciphertext, framed_out, channel_mode=stego.CHANNEL_MODE_SPREAD)),
+        ('extract_bytes_framed', lambda: stego.extract_bytes_framed(framed_out)),
+    ]
+
+    results = []
+    for benchmark, func in cases:
+        stats = measure(func, repeat, warmup)
+        results.append({'benchmark': benchmark, 'params': params, **stats})
+        print(f"{benchmark:32s} {name:28s} p50={stats['p50'] * 1000:9.2f} ms  "
+              f"peak={stats['peak_memory_bytes'] / 2 ** 20:8.1f} MiB")
+
+    for path in (source, legacy_out, framed_out):
+        os.remove(path)
+    return results
+
+def bench_crypto(key_sizes, repeat, warmup):
+    """Benchmark pembangkitan kunci serta enkripsi/dekripsi RSA-OAEP
+
+    Returns:
+        List hasil benchmark
+    """
+    results = []
+    for key_size in key_sizes:
+        private_key, public_key = generate_keys(key_size)
+        encryptor = PKCS1_OAEP.new(RSA.import_key(public_key), hashAlgo=SHA256)
+        decryptor = PKCS1_OAEP.new(RSA.import_key(private_key), hashAlgo=SHA256)
+        ciphertext = encryptor.encrypt(b'benchmark')
+
+        cases = [
+            ('generate_keys', lambda: generate_keys(key_size)),
+            ('oaep_encrypt', lambda: encryptor.encrypt(b'benchmark')),
+            ('oaep_decrypt', lambda: decryptor.decrypt(ciphertext)),
+        ]
+        for benchmark, func in cases:
+            stats = measure(func, repeat, warmup)
+            results.append({'benchmark': benchmark, 'params': {'key_size': key_size}, **stats})
+            print(f"{benchmark:32s} {f'rsa{key_size}':28s} p50={stats['p50'] * 1000:9.2f} ms")
+    return results
+
+def environment():
+    """Informasi lingkungan agar hasil antar mesin/versi dapat dibandingkan"""
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'soundfile': sf.__version__,
+        'libsndfile': sf.__libsndfile_version__,
+        'transform': transform.backend_info(),
+    }
+
+def _key(result):
+    return result['benchmark'], json.dumps(result['params'], sort_keys=True)
+
+def compare(baseline_path, results, threshold):
+    """Bandingkan hasil dengan baseline JSON dan tampilkan perlambatan
+
+    Returns:
+        Jumlah benchmark yang melambat melebihi threshold
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {_key(r): r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"\n=== Perbandingan dengan {baseline_path} (ambang {threshold:.2f}x) ===")
+    for result in results:
+        old = baseline.get(_key(result))
+        if old is None:
+            continue
+        ratio = result['p50'] / old['p50'] if old['p50'] else float('inf')
+        memory_ratio = (result['peak_memory_bytes'] / old['peak_memory_bytes']
+                        if old['peak_memory_bytes'] else 1.0)
+        flag = ''
+        if ratio > threshold or memory_ratio > threshold:
+            regressions += 1
+            flag = '  <-- LEBIH LAMBAT' if ratio > threshold else '  <-- MEMORI NAIK'
+        print(f"{result['benchmark']:32s} {_key(result)[1]:70s} waktu {ratio:5.2f}x  memori {memory_ratio:5.2f}x{flag}")
+    return regressions
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')]
+
+def _float_list(value):
+    return [float(v) for v in value.split(',')]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark jalur utama stego dan kriptografi')
+    parser.add_argument('--durations', type=_float_list, default=[10, 60], help='Durasi audio (detik), pisahkan dengan koma')
+    parser.add_argument('--samplerates', type=_int_list, default=[44100, 96000])
+    parser.add_argument('--bit-depths', type=_int_list, default=[16, 24])
+    parser.add_argument('--channels', type=_int_list, default=[1, 2, 6])
+    parser.add_argument('--key-sizes', type=_int_list, default=[2048, 3072])
+    parser.add_argument('--repeat', type=int, default=5, help='Jumlah pengulangan yang diukur')
+    parser.add_argument('--warmup', type=int, default=1, help='Jumlah eksekusi pemanasan')
+    parser.add_argument('--quick', action='store_true', help='Grid kecil untuk pemeriksaan cepat')
+    parser.add_argument('--skip-crypto', action='store_true')
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help='File JSON hasil')
+    parser.add_argument('--compare', help='File JSON baseline untuk dibandingkan')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Rasio perlambatan yang dianggap regresi')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.quick:
+        args.durations, args.samplerates, args.bit_depths, args.channels = [5], [44100], [16], [2]
+        args.key_sizes, args.repeat = [2048], 3
+
+    private_key, public_key = generate_keys()
+    results = []
+
+    # Gunakan tmpfs jika ada agar I/O disk tidak mendominasi pengukuran
+    workdir_root = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.TemporaryDirectory(prefix='stego-bench-', dir=workdir_root) as workdir:
+        grid = itertools.product(args.durations, args.samplerates, args.bit_depths, args.channels)
+        for duration, samplerate, bit_depth, channels in grid:
+            results += bench_audio(workdir, duration, samplerate, bit_depth, channels,
+                                   args.repeat, args.warmup, public_key)
+
+    if not args.skip_crypto:
+        results += bench_crypto(args.key_sizes, args.repeat, args.warmup)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f"\nHasil disimpan ke {args.output}")
+
+    if args.compare:
+        return 1 if compare(args.compare, results, args.threshold) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,129 @@
 from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Cipher import PKCS1_OAEP, AES
 from Crypto.Hash import SHA256
+from Crypto.Random import get_random_bytes
 import base64
-from typing import Union
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Iterator, BinaryIO, Sequence
+import instrumentation
+from instrumentation import span
 
-def generate_keys():
-    """Generate RSA key pair 2048-bit"""
-    key = RSA.generate(2048)
+SUPPORTED_KEY_SIZES = (2048, 3072, 4096)
+
+# Format envelope hybrid:
+#   versi 1 (satu penerima):
+#     magic (4) | versi (1) | panjang kunci terbungkus (2) | kunci AES terbungkus RSA-OAEP
+#     | prefix nonce (7) | record...
+#   versi 2 (banyak penerima):
+#     magic (4) | versi (1) | jumlah slot (1)
+#     | slot: fingerprint kunci publik (8) | panjang kunci terbungkus (2) | kunci terbungkus
+#     | prefix nonce (7) | record...
+# Setiap record: panjang ciphertext (4) | ciphertext | tag GCM (16)
+# Nonce record = prefix (7) | nomor urut (4) | penanda record terakhir (1)
+# Seluruh header (termasuk semua slot) menjadi associated data setiap record.
+ENVELOPE_MAGIC = b'KRE1'
+ENVELOPE_VERSION = 1
+ENVELOPE_VERSION_MULTI = 2
+ENVELOPE_CHUNK_SIZE = 64 * 1024
+MAX_RECIPIENTS = 255
+_NONCE_PREFIX_SIZE = 7
+_TAG_SIZE = 16
+_SLOT_FINGERPRINT_SIZE = 8
+
+# Cache kunci yang sudah di-parse, beserta objek cipher OAEP dan fingerprint-nya,
+# dengan kunci SHA-256 dari PEM/DER kunci tersebut. Parsing PEM/ASN.1 (dan
+# validasi kunci privat) jauh lebih mahal daripada hash beberapa ratus byte.
+KEY_CACHE_SIZE = 256
+_key_cache = OrderedDict()
+_key_cache_lock = threading.Lock()
+_key_cache_stats = {'hits': 0, 'misses': 0}
+
+def generate_keys(key_size: int = 2048):
+    """Generate RSA key pair (default 2048-bit)"""
+    if key_size not in SUPPORTED_KEY_SIZES:
+        raise ValueError(f"Ukuran kunci tidak didukung: {key_size}")
+    with span('rsa.generate'):
+        key = RSA.generate(key_size)
     return key.export_key(), key.publickey().export_key()
 
+def configure_key_cache(max_entries: int):
+    """Atur jumlah maksimal kunci yang disimpan di cache (0 = nonaktif)"""
+    global KEY_CACHE_SIZE
+    KEY_CACHE_SIZE = max_entries
+    with _key_cache_lock:
+        while len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+
+def key_cache_stats() -> dict:
+    """Statistik cache kunci untuk monitoring"""
+    with _key_cache_lock:
+        return {'entries': len(_key_cache), 'max_entries': KEY_CACHE_SIZE, **_key_cache_stats}
+
+def _key_entry(key: Union[bytes, str, RSA.RsaKey]) -> dict:
+    """Entri cache untuk kunci PEM/DER: {'key': RsaKey, 'cipher': ..., 'fingerprint': ...}
+
+    Cipher dan fingerprint diisi saat pertama kali dibutuhkan. RsaKey yang
+    sudah di-parse hanya dibungkus entri baru tanpa disimpan di cache.
+    """
+    if isinstance(key, RSA.RsaKey):
+        return {'key': key}
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    digest = hashlib.sha256(key).digest()
+    with _key_cache_lock:
+        entry = _key_cache.get(digest)
+        if entry is not None:
+            _key_cache.move_to_end(digest)
+            _key_cache_stats['hits'] += 1
+            return entry
+        _key_cache_stats['misses'] += 1
+
+    with span('rsa.import_key'):
+        entry = {'key': RSA.import_key(key)}
+    with _key_cache_lock:
+        if KEY_CACHE_SIZE > 0:
+            _key_cache[digest] = entry
+            while len(_key_cache) > KEY_CACHE_SIZE:
+                _key_cache.popitem(last=False)
+    return entry
+
+def _entry_cipher(entry: dict):
+    """Objek PKCS1_OAEP (SHA-256) milik entri; aman dipakai bersama antar thread"""
+    if 'cipher' not in entry:
+        entry['cipher'] = PKCS1_OAEP.new(entry['key'], hashAlgo=SHA256)
+    return entry['cipher']
+
+def _entry_fingerprint(entry: dict) -> str:
+    if 'fingerprint' not in entry:
+        entry['fingerprint'] = SHA256.new(entry['key'].publickey().export_key(format='DER')).hexdigest()
+    return entry['fingerprint']
+
+def import_key(key: Union[bytes, str, RSA.RsaKey]) -> RSA.RsaKey:
+    """Parse kunci RSA (PEM/DER) melalui cache kunci
+
+    Args:
+        key: Kunci publik atau privat dalam format bytes/str, atau RsaKey
+
+    Returns:
+        Objek RsaKey
+
+    Raises:
+        ValueError: Jika kunci tidak valid
+    """
+    try:
+        return _key_entry(key)['key']
+    except Exception as e:
+        raise ValueError(f"Kunci tidak valid: {str(e)}")
+
+def max_message_length(key_size: int = 2048) -> int:
+    """Panjang maksimal pesan (bytes) untuk satu blok RSA-OAEP dengan SHA-256"""
+    return key_size // 8 - 2 * SHA256.digest_size - 2
+
 def encrypt_message(message: str, public_key: bytes, as_bytes=False) -> Union[str, bytes]:
     """Enkripsi pesan menggunakan RSA-OAEP dengan SHA-256
     
@@ -27,23 +142,72 @@ def encrypt_message(message: str, public_key: bytes, as_bytes=False) -> Union[st
         if not isinstance(message, str):
             raise ValueError("Pesan harus berupa string")
             
-        if len(message) > 190:
-            raise ValueError("Pesan terlalu panjang untuk RSA 2048 dengan padding OAEP")
+        entry = _key_entry(public_key)
+        pub_key = entry['key']
+        data = message.encode('utf-8')
+        if len(data) > max_message_length(pub_key.size_in_bits()):
+            raise ValueError(f"Pesan terlalu panjang untuk RSA {pub_key.size_in_bits()} dengan padding OAEP")
             
-        pub_key = RSA.import_key(public_key)
-        cipher = PKCS1_OAEP.new(pub_key, hashAlgo=SHA256)
-        encrypted = cipher.encrypt(message.encode('utf-8'))
+        cipher = _entry_cipher(entry)
+        with span('rsa.encrypt'):
+            encrypted = cipher.encrypt(data)
+        instrumentation.inc('crypto_bytes_total', len(data), operation='encrypt')
 
         return encrypted if as_bytes else base64.b64encode(encrypted).decode('utf-8')
     except Exception as e:
         raise ValueError(f"Gagal enkripsi: {str(e)}")
 
-def decrypt_message(encrypted_b64: str, private_key: bytes) -> str:
+def key_fingerprint(key: Union[bytes, RSA.RsaKey]) -> str:
+    """Fingerprint kunci: SHA-256 (hex) dari DER kunci publiknya
+
+    Kunci privat dan pasangan kunci publiknya menghasilkan fingerprint yang sama.
+
+    Args:
+        key: Kunci publik atau privat dalam format bytes, atau RsaKey
+
+    Returns:
+        Fingerprint 64 karakter hex
+
+    Raises:
+        ValueError: Jika kunci tidak valid
+    """
+    try:
+        return _entry_fingerprint(_key_entry(key))
+    except Exception as e:
+        raise ValueError(f"Kunci tidak valid: {str(e)}")
+
+def _private_entry(private_key: Union[bytes, RSA.RsaKey]) -> dict:
+    """Entri cache untuk kunci privat (lihat load_private_key)"""
+    try:
+        entry = _key_entry(private_key)
+    except Exception as e:
+        raise ValueError(f"Kunci privat tidak valid: {str(e)}")
+    if not entry['key'].has_private():
+        raise ValueError("Kunci yang diberikan bukan kunci privat")
+    return entry
+
+def load_private_key(private_key: Union[bytes, RSA.RsaKey]) -> RSA.RsaKey:
+    """Parse kunci privat PEM sekali agar dapat dipakai untuk banyak dekripsi
+
+    Kunci bytes yang sama hanya di-parse sekali selama masih ada di cache kunci.
+
+    Args:
+        private_key: Kunci privat dalam format bytes, atau RsaKey yang sudah di-parse
+
+    Returns:
+        Objek RsaKey
+
+    Raises:
+        ValueError: Jika kunci tidak valid atau bukan kunci privat
+    """
+    return _private_entry(private_key)['key']
+
+def decrypt_message(encrypted_b64: str, private_key: Union[bytes, RSA.RsaKey]) -> str:
     """Dekripsi pesan menggunakan RSA-OAEP
     
     Args:
         encrypted_b64: Pesan terenkripsi dalam format base64
-        private_key: Kunci privat dalam format bytes
+        private_key: Kunci privat dalam format bytes atau hasil load_private_key
     
     Returns:
         Pesan asli yang sudah didekripsi
@@ -52,9 +216,255 @@ def decrypt_message(encrypted_b64: str, private_key: bytes) -> str:
         ValueError: Jika terjadi error dekripsi
     """
     try:
-        priv_key = RSA.import_key(private_key)
-        cipher = PKCS1_OAEP.new(priv_key, hashAlgo=SHA256)
-        decrypted = cipher.decrypt(base64.b64decode(encrypted_b64))
+        cipher = _entry_cipher(_private_entry(private_key))
+        with span('rsa.decrypt'):
+            decrypted = cipher.decrypt(base64.b64decode(encrypted_b64))
+        instrumentation.inc('crypto_bytes_total', len(decrypted), operation='decrypt')
         return decrypted.decode('utf-8')
     except Exception as e:
-        raise ValueError(f"Gagal dekripsi: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Gagal dekripsi: {str(e)}")
+
+def decrypt_block(ciphertext: bytes, private_key: Union[bytes, RSA.RsaKey]) -> bytes:
+    """Dekripsi satu blok RSA-OAEP (SHA-256), misalnya payload stego mode legacy
+
+    Memakai kunci dan cipher dari cache kunci, sama seperti decrypt_envelope.
+
+    Args:
+        ciphertext: Ciphertext sepanjang ukuran kunci
+        private_key: Kunci privat dalam format bytes atau hasil load_private_key
+
+    Returns:
+        Plaintext dalam bentuk bytes
+
+    Raises:
+        ValueError: Jika panjang ciphertext tidak sesuai ukuran kunci atau dekripsi gagal
+    """
+    entry = _private_entry(private_key)
+    key_size = entry['key'].size_in_bytes()
+    if len(ciphertext) != key_size:
+        raise ValueError(f'Panjang ciphertext tidak valid. Harus {key_size} bytes, dapat {len(ciphertext)} bytes')
+    try:
+        with span('rsa.decrypt'):
+            decrypted = _entry_cipher(entry).decrypt(ciphertext)
+    except Exception as e:
+        raise ValueError(f"Gagal dekripsi: {str(e)}")
+    instrumentation.inc('crypto_bytes_total', len(decrypted), operation='decrypt')
+    return decrypted
+
+def is_envelope(data: bytes) -> bool:
+    """Cek apakah data diawali header envelope hybrid"""
+    return data[:len(ENVELOPE_MAGIC)] == ENVELOPE_MAGIC
+
+def _iter_chunks(source: Union[bytes, BinaryIO], chunk_size: int) -> Iterator[bytes]:
+    """Potong bytes atau file biner menjadi chunk berukuran chunk_size"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield bytes(view[i:i + chunk_size])
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+def _record_cipher(key: bytes, prefix: bytes, counter: int, final: bool, header: bytes):
+    """Buat objek AES-GCM untuk satu record envelope"""
+    nonce = prefix + struct.pack('>IB', counter, 1 if final else 0)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=_TAG_SIZE)
+    cipher.update(header)
+    return cipher
+
+def _wrap_session_key(session_key: bytes, public_key: Union[bytes, RSA.RsaKey]):
+    """Bungkus kunci sesi dengan satu kunci publik; kembalikan (fingerprint, kunci terbungkus)"""
+    entry = _key_entry(public_key)
+    with span('envelope.wrap_key'):
+        wrapped = _entry_cipher(entry).encrypt(session_key)
+    return bytes.fromhex(_entry_fingerprint(entry))[:_SLOT_FINGERPRINT_SIZE], wrapped
+
+def _envelope_header(session_key: bytes, public_keys: Sequence[bytes]) -> bytes:
+    """Susun header envelope; versi 1 untuk satu penerima, versi 2 untuk banyak penerima"""
+    prefix = get_random_bytes(_NONCE_PREFIX_SIZE)
+    if len(public_keys) == 1:
+        _, wrapped = _wrap_session_key(session_key, public_keys[0])
+        return ENVELOPE_MAGIC + struct.pack('>BH', ENVELOPE_VERSION, len(wrapped)) + wrapped + prefix
+
+    # Pembungkusan RSA-OAEP per penerima saling independen, jadi dijalankan paralel
+    wrap = instrumentation.propagate(lambda key: _wrap_session_key(session_key, key))
+    with ThreadPoolExecutor(max_workers=min(len(public_keys), os.cpu_count() or 1)) as pool:
+        slots = list(pool.map(wrap, public_keys))
+    header = [ENVELOPE_MAGIC, struct.pack('>BB', ENVELOPE_VERSION_MULTI, len(slots))]
+    for fingerprint, wrapped in slots:
+        header += [fingerprint, struct.pack('>H', len(wrapped)), wrapped]
+    return b''.join(header) + prefix
+
+def iter_encrypt_envelope(source: Union[bytes, BinaryIO], public_key: Union[bytes, Sequence[bytes]],
+                          chunk_size: int = ENVELOPE_CHUNK_SIZE) -> Iterator[bytes]:
+    """Enkripsi data secara streaming dengan envelope RSA-OAEP + AES-256-GCM
+
+    Kunci AES-256 acak dibungkus dengan RSA-OAEP (SHA-256), lalu data
+    dienkripsi per chunk dengan AES-GCM. Record terakhir ditandai di dalam
+    nonce sehingga pemotongan envelope terdeteksi saat dekripsi.
+
+    Jika diberikan beberapa kunci publik, kunci AES yang sama dibungkus
+    untuk setiap penerima (secara paralel) ke slot masing-masing beserta
+    fingerprint kuncinya, sehingga data cukup dienkripsi dan disisipkan
+    sekali.
+
+    Args:
+        source: Data dalam bentuk bytes atau file biner yang dapat dibaca
+        public_key: Kunci publik dalam format bytes, atau list kunci publik
+            untuk banyak penerima
+        chunk_size: Ukuran plaintext per record
+
+    Returns:
+        Iterator berisi potongan envelope dalam bentuk bytes
+
+    Raises:
+        ValueError: Jika terjadi error enkripsi
+    """
+    public_keys = [public_key] if isinstance(public_key, (bytes, bytearray, str)) else list(public_key)
+    if not public_keys:
+        raise ValueError("Gagal enkripsi: minimal satu kunci publik diperlukan")
+    if len(public_keys) > MAX_RECIPIENTS:
+        raise ValueError(f"Gagal enkripsi: maksimal {MAX_RECIPIENTS} penerima")
+    try:
+        session_key = get_random_bytes(32)
+        header = _envelope_header(session_key, public_keys)
+    except Exception as e:
+        raise ValueError(f"Gagal enkripsi: {str(e)}")
+
+    prefix = header[-_NONCE_PREFIX_SIZE:]
+    yield header
+
+    # Baca satu chunk di depan agar record terakhir dapat ditandai
+    chunks = _iter_chunks(source, chunk_size)
+    current = next(chunks, b'')
+    counter = 0
+    while True:
+        upcoming = next(chunks, None)
+        with span('envelope.encrypt'):
+            cipher = _record_cipher(session_key, prefix, counter, upcoming is None, header)
+            ciphertext, tag = cipher.encrypt_and_digest(current)
+        instrumentation.inc('crypto_bytes_total', len(current), operation='encrypt')
+        yield struct.pack('>I', len(ciphertext)) + ciphertext + tag
+        if upcoming is None:
+            break
+        current = upcoming
+        counter += 1
+
+def encrypt_envelope(data: bytes, public_key: Union[bytes, Sequence[bytes]]) -> bytes:
+    """Enkripsi data dengan envelope RSA-OAEP + AES-256-GCM
+
+    Args:
+        data: Data yang akan dienkripsi
+        public_key: Kunci publik dalam format bytes, atau list kunci publik
+            untuk banyak penerima (lihat iter_encrypt_envelope)
+
+    Returns:
+        Envelope lengkap dalam bentuk bytes
+
+    Raises:
+        ValueError: Jika terjadi error enkripsi
+    """
+    return b''.join(iter_encrypt_envelope(data, public_key))
+
+def iter_decrypt_envelope(envelope: bytes, private_key: Union[bytes, RSA.RsaKey]) -> Iterator[bytes]:
+    """Dekripsi envelope hybrid secara streaming
+
+    Args:
+        envelope: Envelope hasil iter_encrypt_envelope
+        private_key: Kunci privat dalam format bytes atau hasil load_private_key
+
+    Returns:
+        Iterator berisi potongan plaintext
+
+    Raises:
+        ValueError: Jika envelope rusak, terpotong, atau kunci tidak cocok
+    """
+    view = memoryview(envelope)
+    try:
+        if not is_envelope(envelope):
+            raise ValueError("Bukan envelope yang valid")
+        version = view[len(ENVELOPE_MAGIC)]
+        offset = len(ENVELOPE_MAGIC) + 1
+        slots = []
+        if version == ENVELOPE_VERSION:
+            (wrapped_len,) = struct.unpack_from('>H', view, offset)
+            offset += 2
+            slots.append((None, bytes(view[offset:offset + wrapped_len])))
+            offset += wrapped_len
+        elif version == ENVELOPE_VERSION_MULTI:
+            count = view[offset]
+            offset += 1
+            for _ in range(count):
+                fingerprint = bytes(view[offset:offset + _SLOT_FINGERPRINT_SIZE])
+                (wrapped_len,) = struct.unpack_from('>H', view, offset + _SLOT_FINGERPRINT_SIZE)
+                offset += _SLOT_FINGERPRINT_SIZE + 2
+                slots.append((fingerprint, bytes(view[offset:offset + wrapped_len])))
+                offset += wrapped_len
+        else:
+            raise ValueError(f"Versi envelope tidak didukung: {version}")
+        prefix = bytes(view[offset:offset + _NONCE_PREFIX_SIZE])
+        offset += _NONCE_PREFIX_SIZE
+        header = bytes(view[:offset])
+
+        entry = _private_entry(private_key)
+        if version == ENVELOPE_VERSION_MULTI:
+            # Cari slot milik kunci ini lewat fingerprint, tanpa mencoba setiap slot
+            own = bytes.fromhex(_entry_fingerprint(entry))[:_SLOT_FINGERPRINT_SIZE]
+            slots = [slot for slot in slots if slot[0] == own]
+            if not slots:
+                raise ValueError("Kunci privat ini bukan salah satu penerima envelope")
+        cipher = _entry_cipher(entry)
+        session_key = None
+        for _, wrapped in slots:
+            try:
+                with span('envelope.unwrap_key'):
+                    session_key = cipher.decrypt(wrapped)
+                break
+            except ValueError:
+                continue
+        if session_key is None:
+            raise ValueError("Incorrect decryption.")
+    except Exception as e:
+        raise ValueError(f"Gagal dekripsi: {str(e)}")
+
+    counter = 0
+    while True:
+        if offset + 4 > len(view):
+            raise ValueError("Gagal dekripsi: envelope terpotong")
+        (length,) = struct.unpack_from('>I', view, offset)
+        offset += 4
+        end = offset + length + _TAG_SIZE
+        if end > len(view):
+            raise ValueError("Gagal dekripsi: envelope terpotong")
+        final = end == len(view)
+        cipher = _record_cipher(session_key, prefix, counter, final, header)
+        try:
+            with span('envelope.decrypt'):
+                plaintext = cipher.decrypt_and_verify(bytes(view[offset:offset + length]),
+                                                      bytes(view[offset + length:end]))
+        except ValueError:
+            raise ValueError("Gagal dekripsi: envelope rusak atau telah diubah")
+        instrumentation.inc('crypto_bytes_total', length, operation='decrypt')
+        yield plaintext
+        if final:
+            break
+        offset = end
+        counter += 1
+
+def decrypt_envelope(envelope: bytes, private_key: Union[bytes, RSA.RsaKey]) -> bytes:
+    """Dekripsi envelope hybrid RSA-OAEP + AES-256-GCM
+
+    Args:
+        envelope: Envelope hasil encrypt_envelope
+        private_key: Kunci privat dalam format bytes atau hasil load_private_key
+
+    Returns:
+        Data asli yang sudah didekripsi
+
+    Raises:
+        ValueError: Jika envelope rusak, terpotong, atau kunci tidak cocok
+    """
+    return b''.join(iter_decrypt_envelope(envelope, private_key))
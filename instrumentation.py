@@ -0,0 +1,258 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+# Instrumentasi ringan tanpa dependensi: span waktu per tahap, counter dan
+# histogram yang dapat diekspor dalam format teks Prometheus, serta log
+# terstruktur per request. Nonaktif secara bawaan; saat nonaktif span()
+# mengembalikan context manager kosong dan inc()/observe() langsung kembali.
+
+PREFIX = 'kriptografi_'
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256 B sampai 64 MiB
+
+STAGE_SECONDS = 'stage_seconds'
+REQUEST_SECONDS = 'http_request_seconds'
+
+_HELP = {
+    STAGE_SECONDS: 'Durasi setiap tahap pemrosesan (detik)',
+    REQUEST_SECONDS: 'Durasi request HTTP (detik)',
+    'payload_bytes': 'Ukuran payload yang disisipkan atau diekstrak (bytes)',
+    'audio_samples_total': 'Jumlah sampel audio (per kanal) yang diproses',
+    'audio_bytes_total': 'Ukuran file audio yang diproses (bytes)',
+    'crypto_bytes_total': 'Jumlah bytes yang dienkripsi atau didekripsi',
+    'http_requests_total': 'Jumlah request HTTP',
+    'bulk_files_total': 'Jumlah file yang diproses /decrypt/bulk',
+}
+
+_NOOP = nullcontext()
+_enabled = False
+_lock = threading.Lock()
+_counters = {}    # (nama, label) -> nilai
+_histograms = {}  # (nama, label) -> [bucket, jumlah bucket, total, count]
+_trace = contextvars.ContextVar('kriptografi_trace', default=None)
+
+logger = logging.getLogger('kriptografi.requests')
+
+def configure(enabled=True):
+    """Aktifkan atau nonaktifkan pengumpulan metrik"""
+    global _enabled
+    _enabled = enabled
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Hapus semua metrik yang sudah terkumpul"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def inc(name, value=1, **labels):
+    """Tambahkan nilai ke counter
+
+    Args:
+        name: Nama counter tanpa prefix, diakhiri '_total'
+        value: Nilai yang ditambahkan
+        **labels: Label Prometheus
+    """
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        trace = _trace.get()
+        if trace is not None:
+            trace['counters'][name] = trace['counters'].get(name, 0) + value
+
+def observe(name, value, buckets=SECONDS_BUCKETS, **labels):
+    """Catat satu observasi ke histogram
+
+    Args:
+        name: Nama histogram tanpa prefix
+        value: Nilai observasi
+        buckets: Batas atas bucket (urut naik)
+        **labels: Label Prometheus
+    """
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+        index = bisect.bisect_left(histogram[0], value)
+        if index < len(buckets):
+            histogram[1][index] += 1
+        histogram[2] += value
+        histogram[3] += 1
+
+def _record_span(stage, elapsed):
+    observe(STAGE_SECONDS, elapsed, stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        with _lock:
+            span = trace['spans'].setdefault(stage, [0, 0.0])
+            span[0] += 1
+            span[1] += elapsed
+
+@contextmanager
+def _span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_span(stage, time.perf_counter() - start)
+
+def span(stage):
+    """Context manager yang mengukur durasi sebuah tahap
+
+    Durasi dicatat di histogram stage_seconds dan, jika ada, di trace
+    request yang sedang berjalan.
+
+    Args:
+        stage: Nama tahap, misalnya 'stego.dct' atau 'audio.decode'
+    """
+    if not _enabled:
+        return _NOOP
+    return _span(stage)
+
+def propagate(func):
+    """Bungkus func agar span di thread lain tercatat ke trace pemanggil
+
+    Dipakai saat pekerjaan diserahkan ke thread pool.
+    """
+    if not _enabled or _trace.get() is None:
+        return func
+    trace = _trace.get()
+
+    def run(*args, **kwargs):
+        token = _trace.set(trace)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _trace.reset(token)
+    return run
+
+def start_trace(**fields):
+    """Mulai trace untuk satu request atau job
+
+    Args:
+        **fields: Informasi yang ikut ditulis ke log (method, path, job, ...)
+
+    Returns:
+        Token untuk finish_trace, atau None jika instrumentasi nonaktif
+    """
+    if not _enabled:
+        return None
+    trace = {'id': uuid.uuid4().hex, 'start': time.perf_counter(), 'fields': fields,
+             'spans': {}, 'counters': {}}
+    return trace, _trace.set(trace)
+
+def finish_trace(token, **fields):
+    """Akhiri trace dan tulis satu baris log JSON berisi durasi setiap tahap
+
+    Args:
+        token: Nilai kembali start_trace
+        **fields: Informasi tambahan (misalnya status)
+
+    Returns:
+        Dictionary isi log, atau None jika tidak ada trace
+    """
+    if token is None:
+        return None
+    trace, context_token = token
+    try:
+        _trace.reset(context_token)
+    except ValueError:
+        # Diakhiri dari context lain (misalnya teardown Flask); cukup lepaskan
+        _trace.set(None)
+    duration = time.perf_counter() - trace['start']
+    with _lock:
+        record = {
+            'trace_id': trace['id'],
+            **trace['fields'],
+            **fields,
+            'duration_ms': round(duration * 1000, 3),
+            'spans': {stage: {'count': count, 'ms': round(seconds * 1000, 3)}
+                      for stage, (count, seconds) in trace['spans'].items()},
+            'counters': dict(trace['counters']),
+        }
+    logger.info(json.dumps(record))
+    return record
+
+@contextmanager
+def trace(**fields):
+    """Context manager untuk start_trace/finish_trace, misalnya di dalam job"""
+    token = start_trace(**fields)
+    status = 'error'
+    try:
+        yield
+        status = 'ok'
+    finally:
+        finish_trace(token, status=status)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(gauges=()):
+    """Ekspor semua metrik dalam format teks Prometheus
+
+    Args:
+        gauges: Iterable tuple (nama, help, nilai, dict label) yang dibaca saat
+            scrape, misalnya statistik key pool dan cache
+
+    Returns:
+        Teks eksposisi Prometheus
+    """
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items(), key=lambda item: item[0])
+        histograms = [(key, (buckets, list(counts), total, count))
+                      for key, (buckets, counts, total, count) in histograms]
+
+    declared = set()
+
+    def declare(name, kind, help_text=None):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f'# HELP {PREFIX}{name} {help_text or _HELP.get(name, name)}')
+            lines.append(f'# TYPE {PREFIX}{name} {kind}')
+
+    for (name, labels), value in counters:
+        declare(name, 'counter')
+        lines.append(f'{PREFIX}{name}{_format_labels(labels)} {_format_value(value)}')
+
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        declare(name, 'histogram')
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+        lines.append(f'{PREFIX}{name}_sum{_format_labels(labels)} {_format_value(total)}')
+        lines.append(f'{PREFIX}{name}_count{_format_labels(labels)} {count}')
+
+    for name, help_text, value, labels in gauges:
+        declare(name, 'gauge', help_text)
+        lines.append(f'{PREFIX}{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(RuntimeError):
+    """Dilempar saat antrean job sudah penuh"""
+
+class JobManager:
+    """Antrean job embed/extract dengan worker pool terbatas
+
+    Setiap job berjalan di salah satu dari `workers` thread. Jumlah job yang
+    menunggu dibatasi `max_pending`, sehingga lonjakan upload tidak
+    menghabiskan CPU dan RAM. Progres dilaporkan per tahap melalui
+    callback `progress(stage, done, total)` yang diberikan ke fungsi job.
+    """
+
+    def __init__(self, workers=2, max_pending=8, retention=3600):
+        """
+        Args:
+            workers: Jumlah job yang boleh berjalan bersamaan
+            max_pending: Jumlah job yang boleh menunggu di antrean
+            retention: Lama (detik) job yang selesai disimpan sebelum dihapus
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stego-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _purge(self):
+        """Hapus catatan job yang sudah selesai lebih lama dari retention"""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] is not None and job['finished'] < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Masukkan job ke antrean
+
+        Args:
+            kind: Jenis job (misalnya 'encrypt' atau 'decrypt')
+            func: Fungsi yang dijalankan; menerima argumen kata kunci `progress`
+            *args, **kwargs: Argumen untuk func
+
+        Returns:
+            ID job
+
+        Raises:
+            JobQueueFull: Jika jumlah job aktif sudah mencapai batas
+        """
+        with self._lock:
+            self._purge()
+            active = sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+            if active >= self.workers + self.max_pending:
+                raise JobQueueFull("Antrean job penuh, coba lagi nanti")
+
+            job_id = str(uuid.uuid4())
+            self._jobs[job_id] = {
+                'id': job_id,
+                'kind': kind,
+                'status': 'queued',
+                'stage': None,
+                'progress': {},
+                'created': time.time(),
+                'started': None,
+                'finished': None,
+                'error': None,
+                'result': None,
+            }
+
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        """Jalankan job dan catat status, progres dan hasilnya"""
+        job = self._jobs[job_id]
+
+        def progress(stage, done, total):
+            with self._lock:
+                job['stage'] = stage
+                job['progress'][stage] = round(done / total, 4) if total else 1.0
+
+        with self._lock:
+            job['status'] = 'running'
+            job['started'] = time.time()
+        try:
+            result = func(*args, progress=progress, **kwargs)
+            with self._lock:
+                job['result'] = result
+                job['status'] = 'done'
+        except Exception as e:
+            logger.error(f"Job {job_id} gagal: {str(e)}")
+            with self._lock:
+                job['error'] = str(e)
+                job['status'] = 'error'
+        finally:
+            with self._lock:
+                job['finished'] = time.time()
+
+    def get(self, job_id):
+        """Salinan status job, atau None jika tidak ditemukan"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(job, progress=dict(job['progress']))
@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+from collections import deque
+
+from encryptor import generate_keys, SUPPORTED_KEY_SIZES
+
+logger = logging.getLogger(__name__)
+
+class KeyPool:
+    """Pool pasangan kunci RSA yang diisi terlebih dahulu oleh background thread
+
+    Pembangkitan kunci RSA memakan waktu ratusan milidetik hingga beberapa
+    detik, sehingga kunci disiapkan sebelum diminta. Jika pool kosong,
+    kunci dibangkitkan secara sinkron.
+    """
+
+    def __init__(self, key_size=2048, target_size=4, low_water=1):
+        """
+        Args:
+            key_size: Ukuran kunci RSA dalam bit (2048, 3072 atau 4096)
+            target_size: Jumlah pasangan kunci yang dijaga di dalam pool
+            low_water: Pengisian ulang dimulai saat isi pool turun ke angka ini
+        """
+        if key_size not in SUPPORTED_KEY_SIZES:
+            raise ValueError(f"Ukuran kunci tidak didukung: {key_size}")
+        if target_size < 1 or not 0 <= low_water < target_size:
+            raise ValueError("target_size harus >= 1 dan 0 <= low_water < target_size")
+
+        self.key_size = key_size
+        self.target_size = target_size
+        self.low_water = low_water
+
+        self._keys = deque()
+        self._lock = threading.Lock()
+        self._refill = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+    def _ensure_started(self):
+        """Jalankan thread pengisi; setelah fork, pool milik proses induk dibuang"""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Kunci dari proses induk tidak boleh dipakai ulang di proses anak
+                self._keys.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='rsa-key-pool', daemon=True)
+            self._thread.start()
+            self._refill.set()
+
+    def _run(self):
+        """Loop pengisi pool: isi sampai target_size setiap kali diminta"""
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            while len(self._keys) < self.target_size:
+                try:
+                    keys = generate_keys(self.key_size)
+                except Exception as e:
+                    logger.error(f"Gagal membangkitkan kunci untuk pool: {str(e)}")
+                    break
+                with self._lock:
+                    self._keys.append(keys)
+                    self.generated += 1
+
+    def start(self):
+        """Mulai mengisi pool di background"""
+        self._ensure_started()
+
+    def get(self):
+        """Ambil satu pasangan kunci dari pool
+
+        Returns:
+            Tuple (private_key, public_key) dalam format PEM bytes
+        """
+        self._ensure_started()
+        with self._lock:
+            keys = self._keys.popleft() if self._keys else None
+            if keys is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            remaining = len(self._keys)
+
+        if remaining <= self.low_water:
+            self._refill.set()
+
+        if keys is None:
+            logger.info("Pool kunci kosong, membangkitkan kunci secara sinkron")
+            keys = generate_keys(self.key_size)
+        return keys
+
+    def stats(self):
+        """Statistik pool untuk monitoring
+
+        Returns:
+            Dictionary berisi ukuran pool, jumlah hit, miss dan kunci yang dibangkitkan
+        """
+        with self._lock:
+            return {
+                'key_size': self.key_size,
+                'size': len(self._keys),
+                'target_size': self.target_size,
+                'low_water': self.low_water,
+                'hits': self.hits,
+                'misses': self.misses,
+                'generated': self.generated,
+            }
@@ -0,0 +1,107 @@
+import logging
+import os
+import re
+import threading
+
+import encryptor
+from encryptor import SUPPORTED_KEY_SIZES
+
+logger = logging.getLogger(__name__)
+
+_KEY_ID = re.compile(r'^[0-9a-f]{64}$')
+
+class KeyRegistry:
+    """Registri kunci publik penerima yang diunggah sekali dan dirujuk lewat ID
+
+    ID kunci adalah fingerprint-nya (SHA-256 dari DER kunci publik), sehingga
+    kunci yang sama selalu mendapat ID yang sama. Kunci disimpan sebagai PEM
+    kanonik di direktori registri dan di-parse lewat cache kunci encryptor,
+    jadi enkripsi ke penerima terdaftar tidak membangkitkan kunci baru dan
+    tidak mem-parse PEM berulang kali.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory: Direktori penyimpanan kunci publik (dibuat jika belum ada)
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key_id):
+        return os.path.join(self.directory, f"{key_id}.pem")
+
+    def register(self, public_key):
+        """Simpan kunci publik dan kembalikan ID-nya
+
+        Args:
+            public_key: Kunci publik RSA dalam format PEM/DER bytes
+
+        Returns:
+            Tuple (ID kunci, True jika kunci baru terdaftar)
+
+        Raises:
+            ValueError: Jika kunci tidak valid, berupa kunci privat, atau ukurannya tidak didukung
+        """
+        key = encryptor.import_key(public_key)
+        if key.has_private():
+            raise ValueError("Unggah kunci publik, bukan kunci privat")
+        if key.size_in_bits() not in SUPPORTED_KEY_SIZES:
+            raise ValueError(f"Ukuran kunci tidak didukung: {key.size_in_bits()}")
+
+        key_id = encryptor.key_fingerprint(key)
+        path = self._path(key_id)
+        with self._lock:
+            if os.path.exists(path):
+                return key_id, False
+            partial = path + '.partial'
+            with open(partial, 'wb') as f:
+                f.write(key.export_key())
+            os.replace(partial, path)
+        logger.info(f"Kunci publik {key_id} ({key.size_in_bits()} bit) didaftarkan")
+        return key_id, True
+
+    def get(self, key_id):
+        """Kunci publik PEM untuk sebuah ID
+
+        Returns:
+            PEM bytes kanonik, sehingga cache kunci encryptor selalu mengenalinya
+
+        Raises:
+            KeyError: Jika ID tidak terdaftar
+        """
+        if not _KEY_ID.match(key_id or ''):
+            raise KeyError(key_id)
+        try:
+            with open(self._path(key_id), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key_id)
+
+    def info(self, key_id):
+        """Informasi kunci terdaftar: ID, ukuran dan PEM
+
+        Raises:
+            KeyError: Jika ID tidak terdaftar
+        """
+        public_key = self.get(key_id)
+        return {
+            'key_id': key_id,
+            'key_size': encryptor.import_key(public_key).size_in_bits(),
+            'public_key': public_key.decode('ascii'),
+        }
+
+    def resolve(self, key_ids):
+        """Kunci publik PEM untuk daftar ID penerima
+
+        Raises:
+            ValueError: Jika ada ID yang tidak terdaftar
+        """
+        public_keys = []
+        for key_id in key_ids:
+            try:
+                public_keys.append(self.get(key_id))
+            except KeyError:
+                raise ValueError(f"Kunci penerima tidak terdaftar: {key_id}")
+        return public_keys
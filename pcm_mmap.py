@@ -0,0 +1,179 @@
+import os
+import shutil
+import struct
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Akses langsung ke sampel PCM tak terkompresi lewat memory map, sehingga
+# penyisipan cukup menimpa rentang sampel yang berubah pada salinan file
+# sumber alih-alih meng-encode ulang seluruh audio.
+
+SUPPORTED_FORMATS = ('WAV', 'WAVEX', 'RF64', 'W64', 'AIFF')
+SUPPORTED_SUBTYPES = ('PCM_16', 'PCM_24', 'PCM_32', 'FLOAT')
+_WIDTHS = {'PCM_16': 2, 'PCM_24': 3, 'PCM_32': 4, 'FLOAT': 4}
+
+FICLONE = 0x40049409  # ioctl Linux untuk reflink (btrfs, XFS, bcachefs, ...)
+
+def supports(info, format, subtype):
+    """Cek apakah output dapat ditulis dengan menimpa salinan file sumber
+
+    Args:
+        info: Hasil sf.info file sumber
+        format: Format output yang sudah di-resolve
+        subtype: Subtype output yang sudah di-resolve
+
+    Returns:
+        True jika format dan subtype output sama dengan sumber dan didukung
+    """
+    return (format == info.format and subtype == info.subtype
+            and format in SUPPORTED_FORMATS and subtype in SUPPORTED_SUBTYPES
+            and not (format == 'AIFF' and subtype == 'FLOAT'))
+
+def clone_file(source, destination):
+    """Salin file, memakai reflink jika filesystem mendukung
+
+    Returns:
+        True jika reflink berhasil (tanpa menyalin data), False jika disalin biasa
+    """
+    if fcntl is not None:
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return True
+            except OSError:
+                pass
+    shutil.copyfile(source, destination)
+    return False
+
+def _riff_data_offset(f, size_format, align):
+    """Offset chunk 'data' pada container RIFF/RF64 (size_format '<I') atau W64 ('<Q')"""
+    if size_format == '<I':
+        f.seek(12)
+        header_size = 8
+    else:
+        f.seek(40)  # GUID riff (16) + ukuran (8) + GUID wave (16)
+        header_size = 24
+    while True:
+        header = f.read(header_size)
+        if len(header) < header_size:
+            raise ValueError("Chunk data tidak ditemukan")
+        chunk_id = header[:4]
+        (size,) = struct.unpack(size_format, header[-struct.calcsize(size_format):])
+        if chunk_id == b'data':
+            return f.tell()
+        if size_format == '<Q':
+            size -= header_size  # ukuran chunk W64 termasuk header
+        f.seek(size + (-size % align), os.SEEK_CUR)
+
+def _aiff_data_offset(f):
+    """Offset sampel pertama pada chunk 'SSND' AIFF"""
+    f.seek(12)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("Chunk SSND tidak ditemukan")
+        chunk_id, size = header[:4], struct.unpack('>I', header[4:])[0]
+        if chunk_id == b'SSND':
+            offset, _ = struct.unpack('>II', f.read(8))
+            return f.tell() + offset
+        f.seek(size + (size & 1), os.SEEK_CUR)
+
+def data_offset(path, format):
+    """Cari posisi byte sampel pertama di file PCM
+
+    Args:
+        path: Path file audio
+        format: Format file menurut libsndfile
+
+    Returns:
+        Tuple (offset byte, True jika big-endian)
+
+    Raises:
+        ValueError: Jika container tidak dikenali
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(12)
+        if format in ('WAV', 'WAVEX', 'RF64') and magic[:4] in (b'RIFF', b'RF64') and magic[8:12] == b'WAVE':
+            return _riff_data_offset(f, '<I', 2), False
+        if format == 'W64' and magic[:4] == b'riff':
+            return _riff_data_offset(f, '<Q', 8), False
+        if format == 'AIFF' and magic[:4] == b'FORM' and magic[8:12] == b'AIFF':
+            return _aiff_data_offset(f), True
+    raise ValueError(f"Container {format} tidak dikenali untuk akses langsung")
+
+class PcmMap:
+    """Memory map sampel PCM sebuah file dengan konversi float seperti libsndfile
+
+    Sampel integer dibaca sebagai nilai / 2^(bit-1) dan ditulis dengan
+    konversi yang sama dengan libsndfile (pembulatan ke integer 32 bit lalu
+    digeser ke lebar sampel), sehingga sampel yang tidak diubah tetap identik
+    bit demi bit dan hasilnya sama dengan jalur tulis ulang penuh.
+    """
+
+    def __init__(self, path, info):
+        """
+        Args:
+            path: Path file PCM yang akan dibuka untuk dibaca dan ditulis
+            info: Hasil sf.info file tersebut
+        """
+        offset, big_endian = data_offset(path, info.format)
+        self.width = _WIDTHS[info.subtype]
+        self.channels = info.channels
+        self.frames = info.frames
+        if offset + self.frames * self.channels * self.width > os.path.getsize(path):
+            raise ValueError("Ukuran chunk data tidak sesuai dengan jumlah frame")
+
+        order = '>' if big_endian else '<'
+        self.big_endian = big_endian
+        self.is_float = info.subtype == 'FLOAT'
+        if self.width == 3:
+            dtype, shape = np.uint8, (self.frames, self.channels, 3)
+        else:
+            dtype = np.dtype(f"{order}{'f' if self.is_float else 'i'}{self.width}")
+            shape = (self.frames, self.channels)
+        self.scale = float(2 ** (8 * self.width - 1))
+        self._map = np.memmap(path, dtype=dtype, mode='r+', offset=offset, shape=shape)
+
+    def read(self, start, count):
+        """Baca count frame mulai dari start sebagai float64 (frame, kanal)"""
+        raw = self._map[start:start + count]
+        if self.is_float:
+            return raw.astype(np.float64)
+        if self.width == 3:
+            raw = raw[..., ::-1] if self.big_endian else raw
+            values = (raw[..., 0].astype(np.int32) | (raw[..., 1].astype(np.int32) << 8)
+                      | (raw[..., 2].astype(np.int32) << 16))
+            values = (values << 8) >> 8  # sign-extend 24 bit
+        else:
+            values = raw
+        return values / self.scale
+
+    def write(self, start, block):
+        """Timpa frame mulai dari start dengan block float (frame, kanal)"""
+        if self.is_float:
+            self._map[start:start + len(block)] = block
+            return
+        # Seperti libsndfile: bulatkan ke integer 32 bit, lalu geser ke lebar sampel
+        values = np.clip(np.rint(block * 2.0 ** 31), -2.0 ** 31, 2.0 ** 31 - 1).astype(np.int64)
+        values = (values >> (32 - 8 * self.width)).astype(np.int32)
+        if self.width == 3:
+            raw = np.stack([values & 0xFF, (values >> 8) & 0xFF, (values >> 16) & 0xFF], axis=-1).astype(np.uint8)
+            self._map[start:start + len(block)] = raw[..., ::-1] if self.big_endian else raw
+        else:
+            self._map[start:start + len(block)] = values
+
+    def close(self):
+        """Tulis perubahan ke disk dan lepaskan memory map"""
+        self._map.flush()
+        del self._map
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
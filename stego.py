@@ -1,11 +1,111 @@
 import numpy as np
 import soundfile as sf
-from scipy.fftpack import dct, idct
+import transform
+from transform import dct, idct, is_fast_length
 import logging
 import os
+import struct
+import zlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from transform_cache import content_hash
+import pcm_mmap
+import instrumentation
+from instrumentation import span
 
-# Konfigurasi logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Konfigurasi mode framed: audio diproses per frame berukuran tetap sehingga
+# memori yang dipakai tidak bergantung pada panjang file
+FRAME_SIZE = 4096          # Jumlah sampel per frame DCT
+FRAMES_PER_BLOCK = 64      # Jumlah frame yang dibaca dan ditransformasi sekaligus
+MIN_EMBED_STRENGTH = 1e-4  # Batas bawah scaling agar bit tetap terbaca pada bagian hening
+SCAN_CHUNK = 1 << 16       # Jumlah koefisien yang diperiksa per langkah ekstraksi legacy
+PCM_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Batas memori cache PCM hasil decode
+
+# Header stego mode framed, selalu disisipkan pada frame pertama (sampel
+# 0 sampai HEADER_FRAME_SIZE) kanal pertama. Payload dimulai setelahnya.
+#   magic (4) | versi (1) | algoritma (1) | frame_size (4) | jumlah kanal (1)
+#   | mode kanal (1) | panjang payload (4) | CRC32 payload (4) | CRC32 header (4)
+HEADER_FRAME_SIZE = 4096
+HEADER_MAGIC = b'KSGH'
+HEADER_VERSION = 1
+HEADER_STRUCT = struct.Struct('>4sBBIBBII')
+HEADER_BYTES = HEADER_STRUCT.size + 4
+ALGORITHM_FRAMED_DCT = 1
+CHANNEL_MODE_FIRST = 0     # Payload hanya pada kanal pertama
+CHANNEL_MODE_SPREAD = 1    # Payload disebar ke semua kanal, tiap kanal ditransformasi paralel
+CHANNEL_WORKERS = os.cpu_count() or 1  # Jumlah thread untuk transformasi per kanal
+EMBED_RETRIES = 8          # Putaran sisip ulang frame yang rusak karena clipping sebelum embed gagal
+EMBED_HEADROOM = 0.8       # Faktor pelemahan frame yang rusak karena clipping di setiap putaran
+
+# Format output yang diizinkan. Format lossy (OGG, MP3) dan subtype beresolusi
+# rendah (8-bit, u-law, ADPCM) merusak tanda koefisien DCT sehingga ditolak.
+OUTPUT_FORMATS = ('WAV', 'WAVEX', 'RF64', 'W64', 'FLAC', 'AIFF')
+OUTPUT_SUBTYPES = ('PCM_16', 'PCM_24', 'PCM_32', 'FLOAT', 'DOUBLE')
+OUTPUT_EXTENSIONS = {'.wav': 'WAV', '.flac': 'FLAC', '.aiff': 'AIFF', '.aif': 'AIFF', '.w64': 'W64'}
+FORMAT_EXTENSIONS = {'WAV': '.wav', 'WAVEX': '.wav', 'RF64': '.wav', 'W64': '.w64', 'FLAC': '.flac', 'AIFF': '.aiff'}
+DEFAULT_OUTPUT_SUBTYPE = 'PCM_24'  # Dipakai jika subtype input tidak dapat dipertahankan
+# Resolusi subtype PCM (bit); subtype float tidak memiliki langkah kuantisasi tetap
+_SUBTYPE_BITS = {'PCM_16': 16, 'PCM_24': 24, 'PCM_32': 32}
+LEGACY_MIN_MARGIN = 8      # Scaling legacy minimal, dalam kelipatan deviasi standar noise kuantisasi output
+
+_channel_executor = None
+_channel_executor_lock = threading.Lock()
+
+# Cache hasil decode dan DCT seluruh file berbasis hash isi (lihat transform_cache)
+_transform_cache = None
+
+def configure_transform_cache(cache):
+    """Aktifkan cache transformasi untuk ekstraksi legacy (None untuk menonaktifkan)
+
+    Args:
+        cache: Instance transform_cache.TransformCache atau None
+    """
+    global _transform_cache
+    _transform_cache = cache
+
+# Cache PCM hasil decode (path absolut -> (mtime, data)), urutan = LRU
+_pcm_cache = OrderedDict()
+_pcm_cache_bytes = 0
+_pcm_cache_reserved = 0  # Bytes PCM yang sedang di-decode dan belum masuk cache
+_pcm_cache_lock = threading.Lock()
+
+def _is_path(file):
+    return isinstance(file, (str, os.PathLike))
+
+def _rewind(file):
+    """Kembalikan file-like ke awal sebelum dibuka soundfile (libsndfile membaca dari posisi saat ini)"""
+    if not _is_path(file):
+        file.seek(0)
+    return file
+
+def _file_size(file):
+    """Ukuran path atau file-like dalam bytes"""
+    if _is_path(file):
+        return os.path.getsize(file)
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END)
+    file.seek(position)
+    return size
+
+def _bits_from_string(message_bits):
+    """Konversi bit string '0'/'1' ke array boolean"""
+    return np.frombuffer(message_bits.encode('ascii'), dtype=np.uint8) == ord('1')
+
+def _bits_to_string(bits):
+    """Konversi array boolean ke bit string '0'/'1'"""
+    return np.where(bits, b'1', b'0').tobytes().decode('ascii')
+
+def _bits_from_bytes(data):
+    """Konversi bytes ke array boolean (MSB terlebih dahulu)"""
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8)).astype(bool)
+
+def _bits_to_bytes(bits):
+    """Konversi array boolean ke bytes, sisa bit yang tidak genap 8 dibuang"""
+    bits = bits[:len(bits) - len(bits) % 8]
+    return np.packbits(bits).tobytes()
 
 def calculate_max_capacity_dct(audio_path):
     """Menghitung kapasitas maksimal bit yang dapat disisipkan
@@ -17,80 +117,230 @@ def calculate_max_capacity_dct(audio_path):
         Jumlah bit maksimal yang dapat disisipkan
     """
     try:
-        data, samplerate = sf.read(audio_path)
-        if len(data.shape) > 1:  # Jika stereo, konversi ke mono
-            data = data.mean(axis=1)
-        return int(len(data) * 0.75)  # Gunakan 75% kapasitas untuk margin error
+        # Cukup baca header; jumlah frame sama dengan panjang hasil konversi mono
+        info = sf.info(audio_path)
+        return int(info.frames * 0.75)  # Gunakan 75% kapasitas untuk margin error
     except Exception as e:
-        logging.error(f"Error menghitung kapasitas: {str(e)}")
+        logger.error(f"Error menghitung kapasitas: {str(e)}")
         return 0
 
-def embed_message_dct(audio_path, message_bits, output_path):
+def embed_message_dct(audio_path, message_bits, output_path, format=None, subtype=None, compression_level=None):
     """Sisipkan pesan ke dalam audio menggunakan DCT
     
     Args:
         audio_path: Path ke file audio asli
         message_bits: Pesan dalam bentuk bit string
         output_path: Path untuk menyimpan audio dengan pesan tersembunyi
+        format: Format output (None = sesuai ekstensi output)
+        subtype: Subtype output (None = sama dengan input)
+        compression_level: Tingkat kompresi FLAC 0.0-1.0 (None = bawaan libsndfile)
     
     Returns:
         True jika berhasil, False jika gagal
     """
+    return _embed_bits_dct(audio_path, _bits_from_string(message_bits), output_path,
+                           format, subtype, compression_level)
+
+def embed_bytes_dct(audio_path, payload, output_path, format=None, subtype=None, compression_level=None):
+    """Sisipkan payload bytes ke dalam audio menggunakan DCT (mode legacy)
+    
+    Args:
+        audio_path: Path ke file audio asli
+        payload: Data yang akan disisipkan dalam bentuk bytes
+        output_path: Path untuk menyimpan audio dengan pesan tersembunyi
+        format: Format output (None = sesuai ekstensi output)
+        subtype: Subtype output (None = sama dengan input)
+        compression_level: Tingkat kompresi FLAC 0.0-1.0 (None = bawaan libsndfile)
+    
+    Returns:
+        True jika berhasil, False jika gagal
+    """
+    return _embed_bits_dct(audio_path, _bits_from_bytes(payload), output_path,
+                           format, subtype, compression_level)
+
+def resolve_output_format(info, output_path, format=None, subtype=None):
+    """Tentukan format dan subtype file output
+
+    Bawaannya mengikuti input: format dari ekstensi output (WAVEX/RF64
+    dipertahankan untuk .wav, format input jika output berupa file-like),
+    subtype sama dengan input sehingga bit depth tidak berubah. Input lossy
+    atau 8-bit ditulis sebagai DEFAULT_OUTPUT_SUBTYPE.
+
+    Args:
+        info: Hasil sf.info file input
+        output_path: Path file output, atau file-like yang dapat di-seek
+        format: Format output yang diminta, atau None
+        subtype: Subtype output yang diminta, atau None
+
+    Returns:
+        Tuple (format, subtype)
+
+    Raises:
+        ValueError: Jika format atau subtype lossy atau tidak didukung
+    """
+    if format is None and not _is_path(output_path):
+        format = info.format
+    elif format is None:
+        extension = os.path.splitext(output_path)[1].lower()
+        format = OUTPUT_EXTENSIONS.get(extension)
+        if format is None:
+            raise ValueError(f"Ekstensi output {extension or '(kosong)'} tidak didukung, tentukan format secara eksplisit")
+        if format == 'WAV' and info.format in ('WAVEX', 'RF64'):
+            format = info.format
+    format = format.upper()
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Format output {format} tidak didukung, gunakan salah satu dari {', '.join(OUTPUT_FORMATS)}")
+
+    if subtype is None:
+        subtype = info.subtype
+        if subtype not in OUTPUT_SUBTYPES or not sf.check_format(format, subtype):
+            subtype = DEFAULT_OUTPUT_SUBTYPE
+    subtype = subtype.upper()
+    if subtype not in OUTPUT_SUBTYPES or not sf.check_format(format, subtype):
+        raise ValueError(f"Subtype {subtype} tidak didukung untuk format {format}")
+    return format, subtype
+
+def _open_output(output_path, info, format, subtype, compression_level):
+    """Buka file output dengan samplerate dan jumlah kanal input"""
+    format, subtype = resolve_output_format(info, output_path, format, subtype)
+    # compression_level hanya berlaku untuk FLAC
+    return sf.SoundFile(output_path, 'w', samplerate=info.samplerate, channels=info.channels,
+                        format=format, subtype=subtype,
+                        compression_level=compression_level if format == 'FLAC' else None)
+
+def output_size_report(input_path, output_path):
+    """Bandingkan ukuran file output dengan file input
+
+    Args:
+        input_path: Path atau file-like input
+        output_path: Path atau file-like output (posisi file-like kembali ke awal)
+
+    Returns:
+        Dictionary berisi ukuran input dan output (bytes), rasio ukuran,
+        serta format dan subtype output
+    """
+    info = sf.info(_rewind(output_path))
+    _rewind(output_path)
+    input_bytes = _file_size(input_path)
+    output_bytes = _file_size(output_path)
+    return {
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'size_ratio': round(output_bytes / input_bytes, 4) if input_bytes else None,
+        'format': info.format,
+        'subtype': info.subtype,
+    }
+
+def _log_embedded(audio_path, output_path):
+    report = output_size_report(audio_path, output_path)
+    instrumentation.inc('audio_bytes_total', report['output_bytes'], operation='embed_output')
+    logger.info(f"Pesan berhasil disisipkan ke audio ({report['format']} {report['subtype']}, "
+                f"{report['output_bytes']} bytes, {report['size_ratio']:.1%} dari input)")
+
+def _embed_bits_dct(audio_path, bits, output_path, format=None, subtype=None, compression_level=None):
+    """Sisipkan array bit ke seluruh file audio dengan satu DCT (mode legacy)
+
+    DCT dihitung pada campuran mono. Perubahan yang dihasilkan ditambahkan
+    ke setiap kanal, sehingga tata letak kanal input tetap dan rata-rata
+    kanal (yang dibaca saat ekstraksi) sama dengan sinyal stego mono.
+
+    Hanya satu array float32 sepanjang audio yang dialokasikan: campuran
+    mono dibaca blok demi blok ke buffer tersebut, DCT dan IDCT menimpanya
+    di tempat, dan karena transformasi linear, IDCT dari selisih koefisien
+    pita pesan langsung menghasilkan selisih sinyal. Pass kedua membaca
+    ulang input ke buffer blok yang dipakai ulang, menambahkan selisih,
+    clip di tempat dan menulis; konversi ke subtype output dilakukan
+    libsndfile saat menulis.
+
+    Scaling legacy tidak memiliki batas bawah, jadi tanpa subtype eksplisit
+    input yang lebih dangkal dari DEFAULT_OUTPUT_SUBTYPE (misalnya PCM_16)
+    tetap ditulis sebagai DEFAULT_OUTPUT_SUBTYPE seperti sebelumnya. Subtype
+    yang noise kuantisasinya dapat membalik bit pesan ditolak.
+    """
     try:
-        # Baca file audio
-        data, samplerate = sf.read(audio_path)
-        original_dtype = data.dtype
-        
-        # Konversi ke mono jika stereo
-        if len(data.shape) > 1:
-            data = data.mean(axis=1)
-        
-        # Normalisasi data audio
-        if np.issubdtype(original_dtype, np.integer):
-            max_val = np.iinfo(original_dtype).max
-            data = data.astype(np.float32) / max_val
+        info = sf.info(audio_path)
+        format, resolved = resolve_output_format(info, output_path, format, subtype)
+        if subtype is None and _SUBTYPE_BITS.get(resolved, 64) < _SUBTYPE_BITS[DEFAULT_OUTPUT_SUBTYPE]:
+            resolved = DEFAULT_OUTPUT_SUBTYPE
+        subtype = resolved
+        block_size = FRAME_SIZE * FRAMES_PER_BLOCK
+        block = np.empty((block_size, info.channels), dtype=np.float32)
+
+        # Pass pertama: campuran mono float32 langsung ke satu buffer
+        signal = np.empty(info.frames, dtype=np.float32)
+        position = 0
+        with sf.SoundFile(audio_path) as src:
+            while True:
+                with span('audio.decode'):
+                    count = src.read(out=block).shape[0]
+                if not count:
+                    break
+                np.mean(block[:count], axis=1, out=signal[position:position + count])
+                position += count
+        signal = signal[:position]
         
         # Tambah padding ke pesan jika perlu
-        padding_length = 8 - (len(message_bits) % 8)
-        padded_bits = message_bits + '0' * padding_length
+        padding_length = 8 - (len(bits) % 8)
+        padded_bits = np.concatenate([bits, np.zeros(padding_length, dtype=bool)])
         
-        # Hitung DCT
-        dct_coeffs = dct(data, norm='ortho')
+        # Hitung DCT (buffer mono ditimpa koefisien)
+        with span('stego.dct'):
+            coeffs = dct(signal, norm='ortho', overwrite_x=True)
         
         # Pilih frekuensi tengah untuk penyisipan
-        start_idx = len(dct_coeffs) // 4
+        start_idx = len(coeffs) // 4
         end_idx = start_idx + len(padded_bits)
         
-        if end_idx > len(dct_coeffs):
-            logging.error("Pesan terlalu panjang untuk file audio ini")
+        if end_idx > len(coeffs):
+            logger.error("Pesan terlalu panjang untuk file audio ini")
             return False
         
-        # Hitung scaling factor adaptif
-        scaling = np.percentile(np.abs(dct_coeffs[start_idx:end_idx]), 90) * 0.05
+        with span('stego.embed_bits'):
+            band = coeffs[start_idx:end_idx]
+            # Hitung scaling factor adaptif
+            scaling = np.percentile(np.abs(band), 90) * 0.05
+            
+            # Noise kuantisasi per koefisien (DCT ortonormal) = langkah / sqrt(12)
+            if subtype in _SUBTYPE_BITS:
+                noise = 2.0 ** (1 - _SUBTYPE_BITS[subtype]) / np.sqrt(12)
+                if scaling < LEGACY_MIN_MARGIN * noise:
+                    logger.error(f"Subtype {subtype} terlalu dangkal untuk payload pada audio ini, "
+                                 f"gunakan {DEFAULT_OUTPUT_SUBTYPE} atau FLOAT")
+                    return False
+            
+            # Sisipkan semua bit sekaligus; simpan hanya selisih koefisien
+            magnitude = np.abs(band) + scaling
+            change = np.where(padded_bits, magnitude, -magnitude) - band
+            coeffs[:] = 0
+            coeffs[start_idx:end_idx] = change
         
-        # Sisipkan setiap bit
-        for i, bit in enumerate(padded_bits):
-            idx = start_idx + i
-            if bit == '1':
-                dct_coeffs[idx] = abs(dct_coeffs[idx]) + scaling
-            else:
-                dct_coeffs[idx] = -abs(dct_coeffs[idx]) - scaling
+        # Transformasi balik selisih koefisien menjadi selisih sinyal
+        with span('stego.idct'):
+            delta = idct(coeffs, norm='ortho', overwrite_x=True)
+        del coeffs, signal
         
-        # Transformasi balik ke domain waktu
-        stego_data = idct(dct_coeffs, norm='ortho')
-        
-        # Kembalikan ke format asli
-        if np.issubdtype(original_dtype, np.integer):
-            stego_data = np.clip(stego_data * max_val, np.iinfo(original_dtype).min, np.iinfo(original_dtype).max)
-            stego_data = stego_data.astype(original_dtype)
-        
-        # Simpan file output
-        sf.write(output_path, stego_data, samplerate, subtype='PCM_24')
-        logging.info("Pesan berhasil disisipkan ke audio")
+        # Pass kedua: terapkan selisih ke semua kanal dan tulis per blok
+        position = 0
+        with sf.SoundFile(audio_path) as src, \
+                _open_output(output_path, info, format, subtype, compression_level) as dst:
+            while True:
+                with span('audio.decode'):
+                    count = src.read(out=block).shape[0]
+                if not count:
+                    break
+                chunk = block[:count]
+                chunk += delta[position:position + count, np.newaxis]
+                np.clip(chunk, -1.0, 1.0, out=chunk)
+                with span('audio.encode'):
+                    dst.write(chunk)
+                position += count
+        instrumentation.inc('audio_samples_total', position, operation='embed')
+        instrumentation.observe('payload_bytes', len(bits) // 8, instrumentation.BYTES_BUCKETS, operation='embed')
+        _log_embedded(audio_path, output_path)
         return True
     
     except Exception as e:
-        logging.error(f"Gagal menyisipkan pesan: {str(e)}")
+        logger.error(f"Gagal menyisipkan pesan: {str(e)}")
         return False
 
 def extract_message_dct(audio_path):
@@ -102,52 +352,683 @@ def extract_message_dct(audio_path):
     Returns:
         String bit yang berisi pesan, atau None jika gagal
     """
-    try:
-        # Baca file audio
+    bits = _extract_bits_dct(audio_path)
+    return None if bits is None else _bits_to_string(bits)
+
+def extract_bytes_dct(audio_path):
+    """Ekstrak payload bytes dari audio (mode legacy)
+    
+    Args:
+        audio_path: Path ke file audio dengan pesan tersembunyi
+    
+    Returns:
+        Payload dalam bentuk bytes, atau None jika gagal
+    """
+    bits = _extract_bits_dct(audio_path)
+    return None if bits is None else _bits_to_bytes(bits)
+
+def _scan_legacy_bits(band, threshold, min_bits, max_bits):
+    """Pindai koefisien per potongan sampai kondisi terminasi legacy terpenuhi
+    
+    Koefisien di bawah threshold dilewati sampai min_bits terkumpul; setelah
+    itu koefisien pertama di bawah threshold menandai akhir pesan.
+    
+    Args:
+        band: Koefisien DCT mulai dari posisi awal pesan
+        threshold: Batas magnitudo koefisien yang membawa bit
+        min_bits: Jumlah bit minimal sebelum terminasi diperbolehkan
+        max_bits: Jumlah bit maksimal yang diambil
+    
+    Returns:
+        Array boolean berisi bit yang terkumpul
+    """
+    collected = []
+    total = 0
+    for offset in range(0, len(band), SCAN_CHUNK):
+        window = band[offset:offset + SCAN_CHUNK]
+        above = np.abs(window) > threshold
+        count = total + np.cumsum(above)
+        stops = np.flatnonzero(~above & (count >= min_bits))
+        limit = stops[0] if len(stops) else len(window)
+        picked = window[:limit][above[:limit]] > 0
+        collected.append(picked)
+        total += len(picked)
+        if len(stops) or total >= max_bits:
+            break
+    if not collected:
+        return np.zeros(0, dtype=bool)
+    return np.concatenate(collected)[:max_bits]
+
+def _read_mono(audio_path):
+    """Baca seluruh file audio sebagai mono (mode legacy)"""
+    with span('audio.decode'):
         data, _ = sf.read(audio_path)
-        
-        # Konversi ke mono jika stereo
-        if len(data.shape) > 1:
-            data = data.mean(axis=1)
-        
-        # Normalisasi data audio
-        if np.issubdtype(data.dtype, np.integer):
-            max_val = np.iinfo(data.dtype).max
-            data = data.astype(np.float32) / max_val
-        
-        # Hitung DCT
-        dct_coeffs = dct(data, norm='ortho')
+    
+    # Konversi ke mono jika stereo
+    if len(data.shape) > 1:
+        data = data.mean(axis=1)
+    
+    # Normalisasi data audio
+    if np.issubdtype(data.dtype, np.integer):
+        max_val = np.iinfo(data.dtype).max
+        data = data.astype(np.float32) / max_val
+    return data
+
+def _legacy_coefficients(audio_path):
+    """Koefisien DCT seluruh file (mono) untuk ekstraksi legacy
+
+    Jika cache transformasi aktif, koefisien DCT disimpan berdasarkan hash
+    isi file, sehingga ekstraksi ulang dari file yang sama hanya
+    membutuhkan perhitungan hash. PCM hasil decode tidak ikut disimpan:
+    setelah DCT ada di cache, PCM tidak pernah dibaca lagi.
+    """
+    cache = _transform_cache
+    if cache is None:
+        data = _read_mono(audio_path)
+        with span('stego.dct'):
+            return dct(data, norm='ortho')
+
+    with span('cache.hash'):
+        digest = content_hash(audio_path)
+    coeffs = cache.get(f'legacy-dct:{digest}')
+    if coeffs is not None:
+        return coeffs
+
+    data = _read_mono(audio_path)
+    with span('stego.dct'):
+        coeffs = dct(data, norm='ortho')
+    return cache.put(f'legacy-dct:{digest}', coeffs)
+
+def _extract_bits_dct(audio_path):
+    """Ekstrak array bit dari seluruh file audio dengan satu DCT (mode legacy)"""
+    try:
+        # Hitung DCT (atau ambil dari cache transformasi)
+        dct_coeffs = _legacy_coefficients(audio_path)
         
         # Temukan start index (sama dengan saat penyisipan)
         start_idx = len(dct_coeffs) // 4
         
         # Ekstrak bit sampai menemukan terminasi
-        extracted_bits = []
         threshold = np.percentile(np.abs(dct_coeffs[start_idx:]), 90) * 0.03
         
         # Ekstrak minimal 256 bytes (untuk RSA 2048-bit)
         min_bits = 2048
         max_bits = 2048 + 64  # Margin kecil
         
-        for i in range(start_idx, len(dct_coeffs)):
-            val = dct_coeffs[i]
-            if abs(val) > threshold:
-                extracted_bits.append('1' if val > 0 else '0')
-                # Hentikan setelah mendapat cukup bit
-                if len(extracted_bits) >= max_bits:
-                    break
-            elif len(extracted_bits) >= min_bits:
-                break
+        with span('stego.extract_bits'):
+            extracted_bits = _scan_legacy_bits(dct_coeffs[start_idx:], threshold, min_bits, max_bits)
         
         if len(extracted_bits) < min_bits:
-            logging.warning("Tidak cukup bit yang diekstrak")
+            logger.warning("Tidak cukup bit yang diekstrak")
             return None
         
         # Potong ke panjang yang tepat (2048 bit untuk RSA 2048-bit)
-        extracted_bits = extracted_bits[:2048]
-        
-        return ''.join(extracted_bits)
+        instrumentation.inc('audio_samples_total', len(dct_coeffs), operation='extract')
+        return extracted_bits[:2048]
     
     except Exception as e:
-        logging.error(f"Gagal ekstrak pesan: {str(e)}")
-        return None
\ No newline at end of file
+        logger.error(f"Gagal ekstrak pesan: {str(e)}")
+        return None
+
+def cache_audio(audio_path):
+    """Decode audio dan simpan PCM-nya di cache agar bisa dipakai ulang
+
+    Cache dibatasi PCM_CACHE_MAX_BYTES; entri yang paling lama tidak
+    dipakai dibuang terlebih dahulu. Ukuran PCM dipesan dari anggaran yang
+    sama sebelum decode, sehingga decode yang berjalan bersamaan tidak
+    memakai memori sementara lebih dari PCM_CACHE_MAX_BYTES; jika anggaran
+    sedang penuh, audio tidak di-cache.
+
+    Args:
+        audio_path: Path ke file audio
+
+    Returns:
+        True jika audio tersimpan di cache, False jika tidak
+    """
+    global _pcm_cache_bytes, _pcm_cache_reserved
+    if _get_cached_audio(audio_path) is not None:
+        return True
+    reserved = 0
+    try:
+        key = os.path.abspath(audio_path)
+        mtime = os.path.getmtime(audio_path)
+        info = sf.info(audio_path)
+        size = info.frames * info.channels * 4
+        with _pcm_cache_lock:
+            if _pcm_cache_reserved + size > PCM_CACHE_MAX_BYTES:
+                return False
+            _pcm_cache_reserved += size
+            reserved = size
+
+        data, _ = sf.read(audio_path, dtype='float32', always_2d=True)
+
+        with _pcm_cache_lock:
+            old = _pcm_cache.pop(key, None)
+            if old is not None:
+                _pcm_cache_bytes -= old[1].nbytes
+            _pcm_cache[key] = (mtime, data)
+            _pcm_cache_bytes += data.nbytes
+            while _pcm_cache_bytes > PCM_CACHE_MAX_BYTES:
+                _, (_, evicted) = _pcm_cache.popitem(last=False)
+                _pcm_cache_bytes -= evicted.nbytes
+        return True
+    except Exception as e:
+        logger.error(f"Gagal menyimpan audio ke cache: {str(e)}")
+        return False
+    finally:
+        if reserved:
+            with _pcm_cache_lock:
+                _pcm_cache_reserved -= reserved
+
+def evict_cached_audio(audio_path):
+    """Hapus PCM sebuah file audio dari cache"""
+    global _pcm_cache_bytes
+    with _pcm_cache_lock:
+        entry = _pcm_cache.pop(os.path.abspath(audio_path), None)
+        if entry is not None:
+            _pcm_cache_bytes -= entry[1].nbytes
+
+def _get_cached_audio(audio_path):
+    """Ambil PCM dari cache, atau None jika tidak ada atau file sudah berubah"""
+    if not _is_path(audio_path):
+        return None
+    key = os.path.abspath(audio_path)
+    with _pcm_cache_lock:
+        entry = _pcm_cache.get(key)
+        if entry is None:
+            return None
+        try:
+            if os.path.getmtime(audio_path) != entry[0]:
+                return None
+        except OSError:
+            return None
+        _pcm_cache.move_to_end(key)
+        return entry[1]
+
+def _read_blocks(audio_path, block_size, first_size=None):
+    """Baca audio blok demi blok (selalu 2D), dari cache PCM jika tersedia
+
+    Args:
+        audio_path: Path ke file audio
+        block_size: Jumlah sampel per blok
+        first_size: Jumlah sampel blok pertama jika berbeda dari block_size
+    """
+    first_size = first_size or block_size
+    cached = _get_cached_audio(audio_path)
+    if cached is not None:
+        with span('audio.decode_cached'):
+            block = cached[:first_size].astype(np.float64)
+        yield block
+        for offset in range(first_size, len(cached), block_size):
+            with span('audio.decode_cached'):
+                block = cached[offset:offset + block_size].astype(np.float64)
+            yield block
+        return
+
+    with sf.SoundFile(_rewind(audio_path)) as src:
+        size = first_size
+        while True:
+            with span('audio.decode'):
+                block = src.read(size, always_2d=True)
+            if not len(block):
+                return
+            yield block
+            size = block_size
+
+def _frame_band(frame_size):
+    """Rentang koefisien frekuensi tengah yang dipakai di setiap frame
+
+    Args:
+        frame_size: Jumlah sampel per frame
+
+    Returns:
+        Tuple (indeks awal, indeks akhir) koefisien DCT
+    """
+    start = frame_size // 4
+    return start, start + frame_size // 2
+
+def _carrier_channels(channels, channel_mode):
+    """Daftar kanal yang membawa payload untuk sebuah mode kanal"""
+    if channel_mode == CHANNEL_MODE_SPREAD:
+        return list(range(channels))
+    if channel_mode == CHANNEL_MODE_FIRST:
+        return [0]
+    raise ValueError(f"Mode kanal tidak dikenal: {channel_mode}")
+
+def _map_channels(func, count):
+    """Jalankan func(i) untuk setiap kanal, paralel di thread pool jika lebih dari satu
+
+    Transformasi SciPy melepas GIL, sehingga kanal-kanal benar-benar
+    diproses bersamaan. Thread transformasi dibagi rata antar kanal yang
+    berjalan bersamaan agar totalnya tidak melebihi jumlah thread backend.
+    """
+    global _channel_executor
+    if count == 1 or CHANNEL_WORKERS <= 1:
+        return [func(i) for i in range(count)]
+    with _channel_executor_lock:
+        if _channel_executor is None:
+            _channel_executor = ThreadPoolExecutor(max_workers=CHANNEL_WORKERS,
+                                                   thread_name_prefix='stego-channel')
+    workers = transform.active_workers() // min(count, CHANNEL_WORKERS)
+
+    def run(i):
+        with transform.limit_workers(workers):
+            return func(i)
+    return list(_channel_executor.map(instrumentation.propagate(run), range(count)))
+
+def calculate_max_capacity_framed(audio_path, frame_size=FRAME_SIZE, channel_mode=CHANNEL_MODE_FIRST):
+    """Menghitung kapasitas maksimal bit payload untuk mode framed
+
+    Frame header dan sisa sampel di akhir file yang tidak membentuk frame
+    penuh tidak ikut dihitung. Pada CHANNEL_MODE_SPREAD kapasitas dikalikan
+    jumlah kanal.
+
+    Args:
+        audio_path: Path ke file audio, atau file-like yang dapat di-seek
+        frame_size: Jumlah sampel per frame
+        channel_mode: CHANNEL_MODE_FIRST atau CHANNEL_MODE_SPREAD
+
+    Returns:
+        Jumlah bit maksimal yang dapat disisipkan
+    """
+    try:
+        info = sf.info(_rewind(audio_path))
+        return framed_capacity(info.frames, info.channels, frame_size, channel_mode)
+    except Exception as e:
+        logger.error(f"Error menghitung kapasitas: {str(e)}")
+        return 0
+
+def framed_capacity(frames, channels, frame_size=FRAME_SIZE, channel_mode=CHANNEL_MODE_FIRST):
+    """Kapasitas bit payload mode framed dari jumlah sampel dan kanal (tanpa membuka file)
+
+    Args:
+        frames: Jumlah sampel per kanal
+        channels: Jumlah kanal
+        frame_size: Jumlah sampel per frame
+        channel_mode: CHANNEL_MODE_FIRST atau CHANNEL_MODE_SPREAD
+
+    Returns:
+        Jumlah bit maksimal yang dapat disisipkan
+    """
+    start, end = _frame_band(frame_size)
+    payload_frames = max(frames - HEADER_FRAME_SIZE, 0) // frame_size
+    return payload_frames * len(_carrier_channels(channels, channel_mode)) * (end - start)
+
+def _embed_frames(frames, bits, active, frame_size):
+    """Sisipkan bit ke sekumpulan frame (in-place)
+
+    Args:
+        frames: Array 2D (jumlah frame, frame_size) berisi sampel satu kanal
+        bits: Array boolean 2D (jumlah frame, bit per frame) berisi bit pesan
+        active: Array boolean 2D seukuran bits; False berarti koefisien tidak diubah
+        frame_size: Jumlah sampel per frame
+    """
+    start, end = _frame_band(frame_size)
+    used = int(np.count_nonzero(active.any(axis=1)))
+    if not used:
+        return
+    bits, active = bits[:used], active[:used]
+
+    with span('stego.dct'):
+        coeffs = dct(frames[:used], norm='ortho', axis=-1)
+    band = coeffs[:, start:end]
+
+    with span('stego.embed_bits'):
+        # Scaling adaptif per frame, sama seperti mode legacy
+        scaling = np.percentile(np.abs(band), 90, axis=1, keepdims=True) * 0.05
+        scaling = np.maximum(scaling, MIN_EMBED_STRENGTH)
+
+        magnitude = np.abs(band) + scaling
+        marked = np.where(bits, magnitude, -magnitude)
+        coeffs[:, start:end] = np.where(active, marked, band)
+
+    with span('stego.idct'):
+        frames[:used] = idct(coeffs, norm='ortho', axis=-1)
+
+def _decode_block(data, num_bits, frame_size, carriers):
+    """Baca bit dari frame-frame sebuah blok berdasarkan tanda koefisien DCT
+
+    Urutan bit: frame demi frame, dan di dalam setiap frame kanal demi kanal.
+    """
+    start, end = _frame_band(frame_size)
+    full_frames = len(data) // frame_size
+
+    def decode(i):
+        frames = data[:full_frames * frame_size, carriers[i]].reshape(full_frames, frame_size)
+        with span('stego.dct'):
+            return dct(frames, norm='ortho', axis=-1)[:, start:end] > 0
+
+    bands = _map_channels(decode, len(carriers))
+    return np.stack(bands, axis=1).ravel()[:num_bits]
+
+def _embed_block(block, bits, frame_size, carriers):
+    """Sisipkan bit ke frame penuh di awal sebuah blok (in-place)
+
+    Bit dibagi dengan urutan yang sama dengan _decode_block; setiap kanal
+    pembawa ditransformasi di thread terpisah.
+
+    Setelah clipping ke [-1, 1] blok di-decode ulang dan dibandingkan dengan
+    bit yang disisipkan. Clipping pada audio yang mendekati skala penuh dapat
+    membalik tanda koefisien, jadi frame yang salah disisipkan ulang dari
+    sampel aslinya yang dilemahkan EMBED_HEADROOM kali lipat per putaran,
+    hingga EMBED_RETRIES kali.
+
+    Returns:
+        Jumlah bit yang disisipkan
+
+    Raises:
+        ValueError: Jika bit masih salah setelah EMBED_RETRIES kali sisip ulang
+    """
+    start, end = _frame_band(frame_size)
+    per_frame = end - start
+    full_frames = len(block) // frame_size
+    capacity = full_frames * len(carriers) * per_frame
+    chunk = bits[:capacity]
+    if not len(chunk):
+        return 0
+
+    shape = (full_frames, len(carriers), per_frame)
+    padded = np.zeros(capacity, dtype=bool)
+    padded[:len(chunk)] = chunk
+    padded = padded.reshape(shape)
+    active = (np.arange(capacity) < len(chunk)).reshape(shape)
+
+    length = full_frames * frame_size
+    original = block[:length].copy()
+    gain = np.ones((full_frames, len(carriers)))
+
+    def embed(i, rows=slice(None)):
+        channel = carriers[i]
+        frames = original[:, channel].reshape(full_frames, frame_size)[rows] * gain[rows, i, None]
+        _embed_frames(frames, padded[rows, i], active[rows, i], frame_size)
+        updated = block[:length, channel].reshape(full_frames, frame_size)
+        updated[rows] = frames
+        block[:length, channel] = updated.ravel()
+
+    _map_channels(embed, len(carriers))
+    np.clip(block, -1.0, 1.0, out=block)
+
+    for _ in range(EMBED_RETRIES + 1):
+        with span('stego.verify'):
+            decoded = _decode_block(block, capacity, frame_size, carriers).reshape(shape)
+        wrong = active & (decoded != padded)
+        if not wrong.any():
+            return len(chunk)
+        # Beri headroom hanya pada frame (per kanal) yang bitnya berubah karena clipping
+        failed = wrong.any(axis=2)
+        gain[failed] *= EMBED_HEADROOM
+        _map_channels(lambda i: embed(i, np.flatnonzero(failed[:, i])), len(carriers))
+        np.clip(block, -1.0, 1.0, out=block)
+    raise ValueError(f"{int(np.count_nonzero(wrong))} bit rusak karena clipping; "
+                     "audio terlalu dekat dengan skala penuh untuk disisipi")
+
+def _pack_header(payload, frame_size, channels, channel_mode):
+    """Susun header stego untuk sebuah payload"""
+    fields = HEADER_STRUCT.pack(HEADER_MAGIC, HEADER_VERSION, ALGORITHM_FRAMED_DCT, frame_size,
+                                channels, channel_mode, len(payload), zlib.crc32(payload))
+    return fields + struct.pack('>I', zlib.crc32(fields))
+
+def _unpack_header(data):
+    """Uraikan header stego, atau None jika bukan header yang valid"""
+    fields, (crc,) = data[:HEADER_STRUCT.size], struct.unpack('>I', data[HEADER_STRUCT.size:HEADER_BYTES])
+    if fields[:len(HEADER_MAGIC)] != HEADER_MAGIC or zlib.crc32(fields) != crc:
+        return None
+    magic, version, algorithm, frame_size, channels, channel_mode, length, payload_crc = \
+        HEADER_STRUCT.unpack(fields)
+    return {
+        'version': version,
+        'algorithm': algorithm,
+        'frame_size': frame_size,
+        'channels': channels,
+        'channel_mode': channel_mode,
+        'payload_length': length,
+        'payload_crc32': payload_crc,
+    }
+
+def _report(progress, stage, done, total):
+    """Laporkan progres sebuah tahap jika callback diberikan"""
+    if progress is not None:
+        progress(stage, done, total)
+
+def _sparse_supported(info, audio_path, output_path, format=None, subtype=None):
+    """Cek apakah embed_bytes_framed(sparse=True) akan menimpa salinan file sumber"""
+    return (_is_path(audio_path) and _is_path(output_path)
+            and pcm_mmap.supports(info, *resolve_output_format(info, output_path, format, subtype)))
+
+def uses_sparse_output(audio_path, output_path, format=None, subtype=None):
+    """Cek apakah embed dengan sparse=True memakai jalur sparse
+
+    Jalur sparse tidak membaca cache PCM, jadi audio yang akan melewatinya
+    tidak perlu di-decode lebih dulu dengan cache_audio.
+
+    Args:
+        audio_path: Path file audio input
+        output_path: Path file output
+        format: Format output yang diminta, atau None
+        subtype: Subtype output yang diminta, atau None
+
+    Returns:
+        True jika output ditulis dengan menimpa salinan file sumber
+    """
+    try:
+        return _sparse_supported(sf.info(audio_path), audio_path, output_path, format, subtype)
+    except (ValueError, RuntimeError):
+        return False
+
+def _embed_framed_sparse(audio_path, output_path, info, header_bits, bits, frame_size, carriers, progress):
+    """Sisipkan dengan menyalin file sumber lalu menimpa frame yang berubah saja
+
+    Hanya frame header dan frame yang memuat payload yang di-decode,
+    ditransformasi dan ditulis kembali lewat memory map, sehingga waktu dan
+    volume tulis bergantung pada ukuran payload, bukan panjang audio.
+
+    Returns:
+        Jumlah sampel (per kanal) yang ditulis ulang
+    """
+    with span('audio.clone'):
+        pcm_mmap.clone_file(audio_path, output_path)
+
+    start, end = _frame_band(frame_size)
+    bits_per_frame = (end - start) * len(carriers)
+    block_size = frame_size * FRAMES_PER_BLOCK
+    with pcm_mmap.PcmMap(output_path, info) as pcm:
+        with span('audio.decode'):
+            block = pcm.read(0, HEADER_FRAME_SIZE)
+        _embed_block(block, header_bits, HEADER_FRAME_SIZE, [0])
+        with span('audio.encode'):
+            pcm.write(0, block)
+        rewritten = len(block)
+
+        offset = HEADER_FRAME_SIZE
+        position = 0
+        while position < len(bits):
+            with span('audio.decode'):
+                block = pcm.read(offset, block_size)
+            used = _embed_block(block, bits[position:], frame_size, carriers)
+            if not used:
+                break
+            position += used
+            # Frame di luar payload tidak berubah, jadi tidak perlu ditulis
+            length = -(-used // bits_per_frame) * frame_size
+            with span('audio.encode'):
+                pcm.write(offset, block[:length])
+            rewritten += length
+            offset += len(block)
+            _report(progress, 'transform', position, len(bits))
+            _report(progress, 'embed', position, len(bits))
+    # Sisa audio tidak perlu di-decode atau di-encode ulang
+    _report(progress, 'decode', info.frames, info.frames)
+    _report(progress, 'encode', info.frames, info.frames)
+    return rewritten
+
+def embed_bytes_framed(audio_path, payload, output_path, frame_size=FRAME_SIZE,
+                       channel_mode=CHANNEL_MODE_FIRST, progress=None, format=None, subtype=None,
+                       compression_level=None, sparse=False):
+    """Sisipkan payload bytes ke dalam audio menggunakan DCT per frame
+
+    Audio dibaca blok demi blok, dan hanya frame yang memuat bit pesan yang
+    ditransformasi. Frame lain disalin apa adanya ke file output, sehingga
+    penggunaan memori tetap meskipun file semakin panjang. Semua kanal
+    dipertahankan; bit disisipkan ke kanal pertama (CHANNEL_MODE_FIRST)
+    atau disebar ke semua kanal (CHANNEL_MODE_SPREAD).
+
+    Frame pertama berisi header berversi (algoritma, ukuran frame, tata
+    letak kanal, panjang dan CRC32 payload), sehingga ekstraksi cukup
+    membaca frame yang memuat payload.
+
+    audio_path dan output_path boleh berupa file-like yang dapat di-seek
+    (misalnya SpooledTemporaryFile), sehingga audio dapat diproses tanpa
+    menyentuh disk; format output file-like bawaannya sama dengan input.
+
+    Args:
+        audio_path: Path ke file audio asli, atau file-like
+        payload: Data yang akan disisipkan dalam bentuk bytes
+        output_path: Path untuk menyimpan audio dengan pesan tersembunyi, atau file-like
+        frame_size: Jumlah sampel per frame
+        channel_mode: CHANNEL_MODE_FIRST atau CHANNEL_MODE_SPREAD
+        progress: Callback opsional progress(stage, done, total) dengan stage
+            'decode', 'transform', 'embed' atau 'encode'
+        format: Format output (None = sesuai ekstensi output)
+        subtype: Subtype output (None = sama dengan input, lihat resolve_output_format)
+        compression_level: Tingkat kompresi FLAC 0.0-1.0 (None = bawaan libsndfile)
+        sparse: Jika True dan output berformat PCM tak terkompresi yang sama
+            dengan sumber (WAV, RF64, W64, AIFF), file sumber disalin (reflink
+            jika didukung) dan hanya frame yang memuat header dan payload yang
+            ditimpa; format lain tetap ditulis ulang seluruhnya
+
+    Returns:
+        True jika berhasil, False jika gagal
+    """
+    try:
+        if not is_fast_length(frame_size):
+            logger.error(f"Ukuran frame {frame_size} memiliki faktor prima besar, gunakan misalnya 4096")
+            return False
+
+        payload = bytes(payload)
+        bits = _bits_from_bytes(payload)
+        if len(bits) > calculate_max_capacity_framed(audio_path, frame_size, channel_mode):
+            logger.error("Pesan terlalu panjang untuk file audio ini")
+            return False
+
+        info = sf.info(_rewind(audio_path))
+        carriers = _carrier_channels(info.channels, channel_mode)
+        header_bits = _bits_from_bytes(_pack_header(payload, frame_size, info.channels, channel_mode))
+
+        if sparse and _sparse_supported(info, audio_path, output_path, format, subtype):
+            rewritten = _embed_framed_sparse(audio_path, output_path, info, header_bits, bits,
+                                             frame_size, carriers, progress)
+            instrumentation.inc('audio_samples_total', rewritten, operation='embed')
+            instrumentation.observe('payload_bytes', len(payload), instrumentation.BYTES_BUCKETS, operation='embed')
+            _log_embedded(audio_path, output_path)
+            return True
+
+        block_size = frame_size * FRAMES_PER_BLOCK
+        position = 0
+
+        with _open_output(output_path, info, format, subtype, compression_level) as dst:
+            blocks = _read_blocks(audio_path, block_size, first_size=HEADER_FRAME_SIZE)
+            header_block = next(blocks)
+            _embed_block(header_block, header_bits, HEADER_FRAME_SIZE, [0])
+            with span('audio.encode'):
+                dst.write(header_block)
+            samples = len(header_block)
+
+            for block in blocks:
+                samples += len(block)
+                _report(progress, 'decode', samples, info.frames)
+                if position < len(bits):
+                    position += _embed_block(block, bits[position:], frame_size, carriers)
+                    _report(progress, 'transform', position, len(bits))
+                    _report(progress, 'embed', position, len(bits))
+                with span('audio.encode'):
+                    dst.write(block)
+                _report(progress, 'encode', samples, info.frames)
+
+        instrumentation.inc('audio_samples_total', samples, operation='embed')
+        instrumentation.observe('payload_bytes', len(payload), instrumentation.BYTES_BUCKETS, operation='embed')
+        _log_embedded(audio_path, output_path)
+        return True
+
+    except Exception as e:
+        logger.error(f"Gagal menyisipkan pesan: {str(e)}")
+        return False
+
+def read_stego_header(audio_path):
+    """Baca header stego dari frame pertama audio
+
+    Hanya HEADER_FRAME_SIZE sampel pertama yang di-decode.
+
+    Args:
+        audio_path: Path ke file audio
+
+    Returns:
+        Dictionary berisi isi header, atau None jika audio tidak berisi header
+    """
+    try:
+        with sf.SoundFile(audio_path) as src:
+            if src.frames < HEADER_FRAME_SIZE:
+                return None
+            channels = src.channels
+            data = src.read(HEADER_FRAME_SIZE, always_2d=True)
+
+        bits = _decode_block(data, HEADER_BYTES * 8, HEADER_FRAME_SIZE, [0])
+        header = _unpack_header(_bits_to_bytes(bits))
+        if header is None or header['version'] != HEADER_VERSION \
+                or header['algorithm'] != ALGORITHM_FRAMED_DCT \
+                or header['channels'] != channels:
+            return None
+        return header
+
+    except Exception as e:
+        logger.error(f"Gagal membaca header: {str(e)}")
+        return None
+
+def extract_bytes_framed(audio_path, progress=None):
+    """Ekstrak payload bytes dari audio yang disisipi dengan embed_bytes_framed
+
+    Header dibaca terlebih dahulu, lalu hanya frame yang memuat payload
+    yang di-decode. File tanpa header langsung ditolak.
+
+    Args:
+        audio_path: Path ke file audio dengan pesan tersembunyi
+        progress: Callback opsional progress(stage, done, total) dengan stage
+            'decode' atau 'transform'
+
+    Returns:
+        Payload dalam bentuk bytes, atau None jika tidak ada atau rusak
+    """
+    header = read_stego_header(audio_path)
+    if header is None:
+        logger.warning("Header stego tidak ditemukan")
+        return None
+
+    try:
+        frame_size = header['frame_size']
+        num_bits = header['payload_length'] * 8
+        carriers = _carrier_channels(header['channels'], header['channel_mode'])
+        start, end = _frame_band(frame_size)
+        used = -(-num_bits // ((end - start) * len(carriers)))
+
+        payload = b''
+        if used:
+            with sf.SoundFile(audio_path) as src:
+                if src.frames < HEADER_FRAME_SIZE + used * frame_size:
+                    logger.warning("Audio lebih pendek dari payload pada header")
+                    return None
+                src.seek(HEADER_FRAME_SIZE)
+                with span('audio.decode'):
+                    data = src.read(used * frame_size, always_2d=True)
+            _report(progress, 'decode', 1, 1)
+            payload = _bits_to_bytes(_decode_block(data, num_bits, frame_size, carriers))
+        _report(progress, 'transform', 1, 1)
+
+        if zlib.crc32(payload) != header['payload_crc32']:
+            logger.warning("Checksum payload tidak cocok")
+            return None
+        instrumentation.inc('audio_samples_total', HEADER_FRAME_SIZE + used * frame_size, operation='extract')
+        instrumentation.observe('payload_bytes', len(payload), instrumentation.BYTES_BUCKETS, operation='extract')
+        return payload
+
+    except Exception as e:
+        logger.error(f"Gagal ekstrak pesan: {str(e)}")
+        return None
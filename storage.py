@@ -0,0 +1,288 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+def _entry_size(path):
+    """Ukuran file, atau total ukuran isi direktori (misalnya folder sementara /decrypt/bulk)"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            try:
+                total += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return total
+
+def _delete(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class StorageManager:
+    """Batas disk untuk file upload, hasil embed dan kunci privat
+
+    Setiap entri tingkat atas di direktori yang dikelola (file, atau folder
+    sementara) dicatat dengan ukuran, waktu akses terakhir dan TTL. Entri
+    yang tidak diakses lebih lama dari TTL-nya dihapus oleh sweeper di
+    background thread, dan jika total ukuran melewati kuota, entri yang
+    paling lama tidak diakses dibuang (LRU). Entri yang sedang dipakai
+    (pin) tidak pernah dihapus.
+
+    Indeks dibangun dari isi direktori dengan mtime sebagai waktu akses
+    terakhir, dan touch() memperbarui mtime file. Karena itu file sisa
+    proses sebelumnya (misalnya setelah crash) ikut dikelola: yang sudah
+    kedaluwarsa dihapus saat startup, sisanya kedaluwarsa seperti biasa.
+    """
+
+    def __init__(self, directories, quota=2 * 1024 * 1024 * 1024, ttl=3600, sweep_interval=60,
+                 on_remove=None):
+        """
+        Args:
+            directories: Direktori yang dikelola (dibuat jika belum ada)
+            quota: Batas total ukuran semua direktori dalam bytes
+            ttl: Lama (detik) entri boleh tidak diakses sebelum dihapus
+            sweep_interval: Jeda (detik) antar sweep di background thread
+            on_remove: Callback opsional on_remove(path) setelah entri dihapus
+                karena kedaluwarsa atau kuota
+        """
+        if quota <= 0 or ttl <= 0 or sweep_interval <= 0:
+            raise ValueError("quota, ttl dan sweep_interval harus lebih dari 0")
+
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.quota = quota
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.on_remove = on_remove
+
+        self._entries = OrderedDict()  # path -> [ukuran, akses terakhir, ttl], urut LRU
+        self._bytes = 0
+        self._pins = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.expired = 0
+        self.evictions = 0
+        self.orphans = 0
+
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+        # Sisa proses sebelumnya (crash, restart) yang sudah kedaluwarsa atau melebihi kuota
+        removed = self.sweep()
+        self.orphans = removed['expired'] + removed['evicted']
+
+    def _scan(self):
+        """Sinkronkan indeks dengan isi direktori (dipanggil tanpa lock)
+
+        Entri yang belum dikenal diadopsi dengan mtime sebagai akses terakhir,
+        entri yang filenya sudah hilang dibuang dari indeks.
+        """
+        found = {}
+        for directory in self.directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    found[entry.path] = entry
+
+        with self._lock:
+            for path in [path for path in self._entries if path not in found]:
+                self._bytes -= self._entries.pop(path)[0]
+            unknown = [entry for path, entry in found.items() if path not in self._entries]
+
+        adopted = []
+        for entry in unknown:
+            try:
+                adopted.append((entry.stat().st_mtime, entry.path, _entry_size(entry.path)))
+            except OSError:
+                continue
+        with self._lock:
+            for mtime, path, size in sorted(adopted):
+                if path not in self._entries:
+                    self._entries[path] = [size, mtime, self.ttl]
+                    self._bytes += size
+            # Entri hasil adopsi bisa lebih lama dari entri yang sudah ada; urutkan ulang
+            if adopted:
+                self._entries = OrderedDict(sorted(self._entries.items(), key=lambda item: item[1][1]))
+
+    def _pop_victims(self, now, keep=None):
+        """Keluarkan entri kedaluwarsa dan entri LRU di atas kuota (dipanggil dengan lock)
+
+        Args:
+            now: Waktu sekarang
+            keep: Path yang tidak boleh dibuang (entri yang baru ditambahkan)
+
+        Returns:
+            Tuple (list path kedaluwarsa, list path hasil eviksi)
+        """
+        expired = [path for path, (_, accessed, ttl) in self._entries.items()
+                   if now - accessed > ttl and not self._pins.get(path)]
+        for path in expired:
+            self._bytes -= self._entries.pop(path)[0]
+
+        evicted = []
+        for path in list(self._entries):
+            if self._bytes <= self.quota:
+                break
+            if self._pins.get(path) or path == keep:
+                continue
+            self._bytes -= self._entries.pop(path)[0]
+            evicted.append(path)
+
+        self.expired += len(expired)
+        self.evictions += len(evicted)
+        return expired, evicted
+
+    def _remove_all(self, paths):
+        for path in paths:
+            _delete(path)
+            if self.on_remove:
+                try:
+                    self.on_remove(path)
+                except Exception as e:
+                    logger.warning(f"Callback penghapusan gagal untuk {path}: {str(e)}")
+
+    def sweep(self):
+        """Hapus entri kedaluwarsa lalu buang entri LRU sampai di bawah kuota
+
+        Returns:
+            Dictionary berisi jumlah entri yang kedaluwarsa dan dibuang
+        """
+        self._scan()
+        with self._lock:
+            expired, evicted = self._pop_victims(time.time())
+        self._remove_all(expired + evicted)
+        if expired or evicted:
+            logger.info(f"Storage: {len(expired)} entri kedaluwarsa, {len(evicted)} dibuang karena kuota")
+        return {'expired': len(expired), 'evicted': len(evicted)}
+
+    def add(self, path, ttl=None, pin=False):
+        """Catat file atau folder baru, lalu buang entri LRU jika kuota terlampaui
+
+        Args:
+            path: Path entri di salah satu direktori yang dikelola
+            ttl: TTL khusus entri ini dalam detik (None = ttl bawaan)
+            pin: Jika True, entri langsung di-pin (lepaskan dengan unpin)
+
+        Returns:
+            True jika total ukuran berada di bawah kuota setelah eviksi
+        """
+        path = os.path.abspath(path)
+        size = _entry_size(path)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[0]
+            self._entries[path] = [size, time.time(), ttl or self.ttl]
+            self._bytes += size
+            if pin:
+                self._pins[path] = self._pins.get(path, 0) + 1
+            expired, evicted = self._pop_victims(time.time(), keep=path)
+            within_quota = self._bytes <= self.quota
+        self._remove_all(expired + evicted)
+        if not within_quota:
+            logger.warning(f"Kuota storage terlampaui: {self._bytes} dari {self.quota} bytes sedang dipakai")
+        return within_quota
+
+    def touch(self, path):
+        """Tandai entri baru saja diakses (misalnya saat diunduh)"""
+        path = os.path.abspath(path)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return
+            entry[1] = now
+            self._entries.move_to_end(path)
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def pin(self, path):
+        """Lindungi entri dari TTL dan eviksi selama sedang dipakai"""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._pins[path] = self._pins.get(path, 0) + 1
+
+    def unpin(self, path):
+        """Lepaskan satu pin; entri dianggap baru diakses"""
+        path = os.path.abspath(path)
+        with self._lock:
+            count = self._pins.get(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+            else:
+                self._pins.pop(path, None)
+        self.touch(path)
+
+    @contextmanager
+    def pinned(self, path):
+        """Context manager untuk pin/unpin"""
+        self.pin(path)
+        try:
+            yield path
+        finally:
+            self.unpin(path)
+
+    def remove(self, path):
+        """Hapus entri dari disk dan indeks"""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._bytes -= entry[0]
+            self._pins.pop(path, None)
+        _delete(path)
+
+    def _run(self):
+        """Loop sweeper: sweep setiap sweep_interval detik sampai stop()"""
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Sweep storage gagal: {str(e)}")
+
+    def start(self):
+        """Jalankan sweeper di background; aman dipanggil berulang dan setelah fork"""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='storage-sweeper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Hentikan sweeper"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self):
+        """Statistik storage untuk monitoring
+
+        Returns:
+            Dictionary berisi jumlah entri, pemakaian, kuota dan jumlah penghapusan
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'quota': self.quota,
+                'pinned': len(self._pins),
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'orphans_removed': self.orphans,
+            }
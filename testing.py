@@ -1,10 +1,24 @@
 import os
+import sys
+import csv
+import json
 import time
+import sqlite3
+import hashlib
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import numpy as np
 import soundfile as sf
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP
-from scipy.fftpack import dct, idct
+from transform import dct, idct
+from transform_cache import content_hash
+from audio_metrics import compare_files
+from batch import collect_inputs, _init_worker
+import stego
 
 # ======== RSA Functions ========
 def generate_rsa_keys():
@@ -35,24 +49,13 @@ def embed_data_dct(audio_path, output_path, data_bytes, bits_per_coeff=1):
         raise ValueError("Data terlalu besar untuk disisipkan pada audio ini")
 
     # Konversi data_bytes ke bit array
-    data_bits = []
-    for byte in data_bytes:
-        bits = bin(byte)[2:].rjust(8, '0')
-        data_bits.extend([int(b) for b in bits])
+    data_bits = np.unpackbits(np.frombuffer(data_bytes, dtype=np.uint8)).astype(bool)
 
     # Embed bit halus ke koefisien DCT (dengan gangguan minimum)
-    for i, bit in enumerate(data_bits):
-        idx = start_index + i
-        coeff = audio_dct[idx]
-        if coeff == 0:
-            coeff = 1e-10  # Hindari pembulatan 0
-
-        if bit == 1:
-            coeff += 0.0001 if coeff > 0 else -0.0001
-        else:
-            coeff -= 0.0001 if coeff > 0 else -0.0001
-
-        audio_dct[idx] = coeff
+    coeffs = audio_dct[start_index:end_index]
+    coeffs[coeffs == 0] = 1e-10  # Hindari pembulatan 0
+    direction = np.where(coeffs > 0, 0.0001, -0.0001)
+    audio_dct[start_index:end_index] = np.where(data_bits, coeffs + direction, coeffs - direction)
 
     stego_audio = idct(audio_dct, norm='ortho')
 
@@ -76,21 +79,9 @@ def extract_data_dct(stego_path, data_length):
 
     total_bits = data_length * 8
     start_index = 1000
-    bits = []
-
-    for i in range(total_bits):
-        idx = start_index + i
-        coeff = audio_dct[idx]
-        bits.append(1 if coeff > 0 else 0)
-
-    data_bytes = bytearray()
-    for i in range(0, len(bits), 8):
-        byte = 0
-        for j in range(8):
-            byte = (byte << 1) | bits[i + j]
-        data_bytes.append(byte)
+    bits = audio_dct[start_index:start_index + total_bits] > 0
 
-    return bytes(data_bytes)
+    return np.packbits(bits).tobytes()
 
 # ======== Pengujian ========
 def avalanche_effect_test(public_key):
@@ -117,31 +108,8 @@ def timing_test(data, pub_key, priv_key):
     return enc_time, dec_time
 
 def snr_test(original_audio_path, stego_audio_path):
-    try:
-        original, sr1 = sf.read(original_audio_path)
-        stego, sr2 = sf.read(stego_audio_path)
-        if sr1 != sr2:
-            raise ValueError("Sample rate berbeda antara original dan stego")
-        
-        if original.ndim > 1:
-            original = original[:,0]
-        if stego.ndim > 1:
-            stego = stego[:,0]
-        
-        min_len = min(len(original), len(stego))
-        original = original[:min_len].astype(np.float64)
-        stego = stego[:min_len].astype(np.float64)
-        
-        noise = original - stego
-        signal_power = np.mean(original**2)
-        noise_power = np.mean(noise**2)
-        if noise_power == 0:
-            return float('inf')
-        
-        snr = 10 * np.log10(signal_power / noise_power)
-        return snr
-    except Exception:
-        return None
+    # SNR global atas semua kanal; error (sample rate/kanal berbeda) dilempar ke pemanggil
+    return compare_files(original_audio_path, stego_audio_path)['snr_db']
 
 def max_capacity_test(audio_path, bits_per_coeff=1):
     audio, _ = sf.read(audio_path)
@@ -152,37 +120,332 @@ def max_capacity_test(audio_path, bits_per_coeff=1):
     capacity_bytes = capacity_bits // 8
     return capacity_bytes
 
+HEAVY_MODULES = ('numpy', 'scipy', 'soundfile', 'Crypto')
+# Batas median waktu cold import app (detik); saat ini sekitar 0,2 detik karena Flask
+COLD_IMPORT_BUDGET = 0.5
+
+def cold_import_test(module='app', repeat=5):
+    # Import modul di interpreter baru; kembalikan median waktu (detik) dan modul berat yang ikut ter-load.
+    # Dijalankan dari direktori sementara agar side effect app (folder upload, cleanup atexit) tidak menyentuh repo
+    repo = os.path.dirname(os.path.abspath(__file__))
+    code = (f"import sys, time, json; sys.path.insert(0, {repo!r}); start = time.perf_counter(); import {module}; "
+            f"print(json.dumps([time.perf_counter() - start, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))")
+    times, loaded = [], []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            output = subprocess.run([sys.executable, '-c', code], cwd=workdir, check=True,
+                                    capture_output=True, text=True).stdout
+        elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+        times.append(elapsed)
+    return float(np.median(times)), loaded
+
+# Batas puncak memori embed legacy: kelipatan ukuran PCM float32 (sampel x kanal x 4 byte) ditambah buffer blok
+PEAK_MEMORY_RATIO = 1.5
+
+def peak_memory_test(audio_path, data_bytes, output_path='temp_stego_legacy.wav'):
+    # Puncak alokasi (tracemalloc, termasuk array NumPy) saat stego.embed_bytes_dct; kembalikan (puncak, batas) dalam byte
+    info = sf.info(audio_path)
+    block_bytes = stego.FRAME_SIZE * stego.FRAMES_PER_BLOCK * info.channels * 4
+    limit = PEAK_MEMORY_RATIO * info.frames * info.channels * 4 + block_bytes
+    tracemalloc.start()
+    try:
+        if not stego.embed_bytes_dct(audio_path, data_bytes, output_path):
+            raise ValueError("Embed legacy gagal")
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    return peak, limit
+
+# Puncak noise yang dibatasi tanh untuk uji round trip framed mendekati skala penuh
+FULL_SCALE_PEAKS = (1.0, 0.9, 0.7, 0.5)
+
+def full_scale_roundtrip_test(peaks=FULL_SCALE_PEAKS, payload_size=2000, seconds=3, sample_rate=44100):
+    # Embed framed ke audio mendekati skala penuh lalu ekstrak; kembalikan daftar kegagalan.
+    # Clipping setelah penyisipan tidak boleh menghasilkan file yang "berhasil" tetapi tidak dapat di-decode
+    rng = np.random.default_rng(0)
+    payload = rng.bytes(payload_size)
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'full_scale.wav')
+        output = os.path.join(workdir, 'full_scale_stego.wav')
+        for peak in peaks:
+            audio = np.tanh(rng.normal(0, 3, (seconds * sample_rate, 2)))
+            sf.write(source, audio / np.abs(audio).max() * peak, sample_rate, subtype='PCM_16')
+            for channel_mode in (stego.CHANNEL_MODE_FIRST, stego.CHANNEL_MODE_SPREAD):
+                for sparse in (False, True):
+                    label = f'puncak {peak}, mode kanal {channel_mode}, sparse {sparse}'
+                    if not stego.embed_bytes_framed(source, payload, output, channel_mode=channel_mode, sparse=sparse):
+                        failures.append(f'{label}: embed gagal')
+                    elif stego.extract_bytes_framed(output) != payload:
+                        failures.append(f'{label}: payload tidak dapat diekstrak')
+    return failures
+
+# ======== Harness Evaluasi Korpus ========
+# Naikkan jika embed_data_dct, metrik atau uji per file berubah; hasil lama di store tidak dipakai lagi
+ALGORITHM_VERSION = 1
+DEFAULT_STORE = os.path.join('cache', 'evaluation.sqlite')
+METRICS = ('snr_db', 'segmental_snr_db', 'peak_error', 'spectral_distortion_db', 'capacity_bytes',
+           'embed_seconds', 'peak_memory_bytes', 'peak_memory_limit')
+REPORT_PERCENTILES = (50, 90, 99)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    content_hash TEXT NOT NULL,
+    algorithm_version INTEGER NOT NULL,
+    params_hash TEXT NOT NULL,
+    metrics TEXT,
+    error TEXT,
+    seconds REAL,
+    evaluated_at REAL,
+    PRIMARY KEY (content_hash, algorithm_version, params_hash)
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+
+def open_store(path=DEFAULT_STORE):
+    # Store hasil SQLite: satu baris per (hash isi audio, versi algoritma, hash parameter)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.executescript(_SCHEMA)
+    return db
+
+def _meta(db, name, create):
+    row = db.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+    if row is not None:
+        return row[0]
+    value = create()
+    with db:
+        db.execute('INSERT INTO meta (name, value) VALUES (?, ?)', (name, value))
+    return value
+
+def evaluation_keys(db, data_bytes):
+    # OAEP teracak, jadi kunci RSA dan ciphertext disimpan agar payload yang disisipkan sama di setiap run
+    priv_key = RSA.import_key(_meta(db, 'private_key', lambda: RSA.generate(2048).export_key()))
+    pub_key = priv_key.publickey()
+    ciphertext = _meta(db, 'ciphertext:' + hashlib.sha256(data_bytes).hexdigest(),
+                       lambda: encrypt_rsa(data_bytes, pub_key))
+    return pub_key, priv_key, ciphertext
+
+def evaluation_params(payload, bits_per_coeff=1, peak_memory=True):
+    # Semua pengaturan yang memengaruhi hasil per file; berubah -> file dihitung ulang
+    params = {
+        'payload_sha256': hashlib.sha256(payload).hexdigest(),
+        'bits_per_coeff': bits_per_coeff,
+        'peak_memory': peak_memory,
+        'peak_memory_ratio': PEAK_MEMORY_RATIO if peak_memory else None,
+    }
+    return params, hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+def content_hashes(db, paths, workers=None):
+    # Hash isi hanya dihitung ulang untuk file yang mtime atau ukurannya berubah
+    known = {row[0]: row[1:] for row in db.execute('SELECT path, mtime_ns, size, content_hash FROM file_hashes')}
+    hashes, stale = {}, []
+    for path in paths:
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = known.get(key)
+        if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            hashes[path] = entry[2]
+        else:
+            stale.append((path, key, stat.st_mtime_ns, stat.st_size))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(lambda item: content_hash(item[0]), stale))
+    with db:
+        db.executemany('INSERT OR REPLACE INTO file_hashes (path, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?)',
+                       [(key, mtime_ns, size, digest) for (_, key, mtime_ns, size), digest in zip(stale, digests)])
+    for (path, _, _, _), digest in zip(stale, digests):
+        hashes[path] = digest
+    return hashes
+
+def evaluate_file(audio_path, payload, bits_per_coeff=1, peak_memory=True):
+    # Uji per file di worker; kembalikan (metrik, error, detik). File stego sementara unik per panggilan
+    start = time.perf_counter()
+    fd, stego_path = tempfile.mkstemp(suffix='.wav', prefix='eval-')
+    os.close(fd)
+    try:
+        embed_start = time.perf_counter()
+        embed_data_dct(audio_path, stego_path, payload, bits_per_coeff)
+        result = {'embed_seconds': time.perf_counter() - embed_start}
+        metrics = compare_files(audio_path, stego_path)
+        result.update({key: metrics[key] for key in ('snr_db', 'segmental_snr_db', 'peak_error', 'spectral_distortion_db')})
+        result['capacity_bytes'] = max_capacity_test(audio_path, bits_per_coeff)
+        if peak_memory:
+            result['peak_memory_bytes'], result['peak_memory_limit'] = peak_memory_test(
+                audio_path, payload, stego_path[:-4] + '-legacy.wav')
+        return result, None, time.perf_counter() - start
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+    finally:
+        os.remove(stego_path)
+
+def aggregate(rows):
+    # Statistik ringkas setiap metrik atas file yang berhasil (nilai tak hingga/NaN diabaikan)
+    stats = {}
+    for metric in METRICS:
+        values = np.array([row[metric] for row in rows if row.get(metric) is not None], dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            continue
+        stats[metric] = {'count': int(len(values)), 'mean': float(values.mean()),
+                         'min': float(values.min()), 'max': float(values.max())}
+        for p in REPORT_PERCENTILES:
+            stats[metric][f'p{p}'] = float(np.percentile(values, p))
+    return stats
+
+def write_reports(report, csv_path=None, json_path=None):
+    if csv_path:
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['file', 'content_hash', 'cached', 'error', *METRICS],
+                                    extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(report['results'])
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
 # ======== Eksekusi Batch Pengujian ========
-def run_tests_on_all_audio(audio_folder, data_path):
+def run_tests_on_all_audio(audio_folder, data_path, workers=None, store_path=DEFAULT_STORE,
+                           csv_path='evaluation_report.csv', json_path='evaluation_report.json',
+                           recursive=False, bits_per_coeff=1, peak_memory=True, force=False):
+    start = time.perf_counter()
     with open(data_path, 'rb') as f:
         data_bytes = f.read()
 
-    pub_key, priv_key = generate_rsa_keys()
-    audio_files = [f for f in os.listdir(audio_folder) if f.lower().endswith(('.wav', '.flac'))]
+    db = open_store(store_path)
+    pub_key, priv_key, payload = evaluation_keys(db, data_bytes)
+    params, params_hash = evaluation_params(payload, bits_per_coeff, peak_memory)
 
+    # Uji yang tidak bergantung pada file audio cukup sekali per run
+    avalanche = avalanche_effect_test(pub_key)
+    enc_time, dec_time = timing_test(data_bytes, pub_key, priv_key)
     print("=== HASIL PENGUJIAN BATCH AUDIO ===\n")
-    for audio_file in audio_files:
-        print(f'\n--- Menguji: {audio_file} ---')
-        full_path = os.path.join(audio_folder, audio_file)
+    print(f'Avalanche Effect       : {avalanche:.2f}%')
+    print(f'Waktu Enkripsi         : {enc_time:.4f} detik')
+    print(f'Waktu Dekripsi         : {dec_time:.4f} detik')
+
+    paths = [path for path, _ in collect_inputs(audio_folder, recursive)]
+    hashes = content_hashes(db, paths, workers)
+    # File yang gagal di run sebelumnya dicoba lagi
+    cached = {} if force else {
+        row[0]: row[1:] for row in db.execute(
+            'SELECT content_hash, metrics, error FROM results '
+            'WHERE algorithm_version = ? AND params_hash = ? AND error IS NULL',
+            (ALGORITHM_VERSION, params_hash))}
 
-        try:
-            avalanche = avalanche_effect_test(pub_key)
-            enc_time, dec_time = timing_test(data_bytes, pub_key, priv_key)
+    # File dengan isi sama cukup dievaluasi sekali
+    pending = {}
+    for path in paths:
+        if hashes[path] not in cached and hashes[path] not in pending:
+            pending[hashes[path]] = path
+    print(f'\n{len(paths)} file, {len(pending)} perlu dievaluasi, {len(paths) - len(pending)} dari store\n')
 
-            encrypted_data = encrypt_rsa(data_bytes, pub_key)
-            embed_data_dct(full_path, 'temp_stego.wav', encrypted_data)
+    computed = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(evaluate_file, path, payload, bits_per_coeff, peak_memory): digest
+                   for digest, path in pending.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            digest = futures[future]
+            metrics, error, seconds = future.result()
+            # Disimpan per file agar run yang terhenti dapat dilanjutkan
+            with db:
+                db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (digest, ALGORITHM_VERSION, params_hash, json.dumps(metrics) if metrics else None,
+                            error, seconds, time.time()))
+            computed[digest] = (json.dumps(metrics) if metrics else None, error)
+            name = os.path.relpath(pending[digest], audio_folder)
+            if error:
+                print(f'[{done}/{len(pending)}] [ERROR] Gagal menguji {name}: {error}')
+            else:
+                print(f'[{done}/{len(pending)}] {name}: SNR {metrics["snr_db"]:.2f} dB ({seconds:.2f} detik)')
+    db.close()
 
-            snr = snr_test(full_path, 'temp_stego.wav')
-            max_cap = max_capacity_test(full_path, bits_per_coeff=1)
+    rows = []
+    for path in paths:
+        digest = hashes[path]
+        metrics, error = computed.get(digest) or cached[digest]
+        row = {'file': os.path.relpath(path, audio_folder), 'content_hash': digest,
+               'cached': digest not in computed, 'error': error}
+        row.update(json.loads(metrics) if metrics else {})
+        rows.append(row)
 
-            print(f'Avalanche Effect       : {avalanche:.2f}%')
-            print(f'Waktu Enkripsi         : {enc_time:.4f} detik')
-            print(f'Waktu Dekripsi         : {dec_time:.4f} detik')
-            print(f'SNR Audio              : {snr:.2f} dB' if snr is not None else "SNR Audio              : Gagal dihitung")
-            print(f'Kapasitas Maksimum DCT : {max_cap} byte')
-        except Exception as e:
-            print(f'[ERROR] Gagal menguji {audio_file}: {e}')
+    ok = [row for row in rows if not row['error']]
+    over_limit = [row['file'] for row in ok if row.get('peak_memory_bytes', 0) > row.get('peak_memory_limit', float('inf'))]
+    report = {
+        'algorithm_version': ALGORITHM_VERSION,
+        'params': params,
+        'params_hash': params_hash,
+        'file_independent': {'avalanche_percent': avalanche, 'rsa_encrypt_seconds': enc_time,
+                             'rsa_decrypt_seconds': dec_time},
+        'files': {'total': len(rows), 'evaluated': len(computed),
+                  'cached': sum(1 for row in rows if row['cached']), 'errors': len(rows) - len(ok)},
+        'peak_memory_over_limit': over_limit,
+        'aggregate': aggregate(ok),
+        'seconds': round(time.perf_counter() - start, 3),
+        'results': rows,
+    }
+    write_reports(report, csv_path, json_path)
+
+    print('\n=== RINGKASAN ===')
+    for metric, stats in report['aggregate'].items():
+        print(f'{metric:22s} rata-rata {stats["mean"]:12.4f}  min {stats["min"]:12.4f}  '
+              f'p50 {stats["p50"]:12.4f}  maks {stats["max"]:12.4f}')
+    for name in over_limit:
+        print(f'[ERROR] Puncak memori embed {name} melebihi {PEAK_MEMORY_RATIO}x ukuran PCM')
+    print(f'{report["files"]["total"]} file, {report["files"]["evaluated"]} dievaluasi, '
+          f'{report["files"]["cached"]} dari store, {report["files"]["errors"]} gagal ({report["seconds"]} detik)')
+    return report
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Evaluasi stego dan RSA untuk korpus audio (hasil di-cache per file)')
+    parser.add_argument('audio_folder', nargs='?', default='audio_files', help='Folder berisi file audio')
+    parser.add_argument('-p', '--payload', default='plainteks3.txt', help='File plainteks yang dienkripsi dan disisipkan')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Jumlah proses worker')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Store hasil SQLite')
+    parser.add_argument('--csv', default='evaluation_report.csv', help='Laporan CSV per file')
+    parser.add_argument('--json', default='evaluation_report.json', help='Laporan JSON dengan statistik agregat')
+    parser.add_argument('--recursive', action='store_true', help='Telusuri subdirektori')
+    parser.add_argument('--bits-per-coeff', type=int, default=1)
+    parser.add_argument('--skip-peak-memory', action='store_true', help='Lewati uji puncak memori embed legacy')
+    parser.add_argument('--skip-cold-import', action='store_true')
+    parser.add_argument('--cold-import-budget', type=float, default=COLD_IMPORT_BUDGET,
+                        help='Batas median waktu cold import app (detik)')
+    parser.add_argument('--force', action='store_true', help='Hitung ulang semua file meskipun ada di store')
+    return parser
 
 # ======== Main Entry Point ========
 if __name__ == '__main__':
-    run_tests_on_all_audio('audio_files', 'plainteks3.txt')
+    args = build_parser().parse_args()
+    failures = []
+    if not args.skip_cold_import:
+        startup, loaded = cold_import_test('app')
+        print(f'Cold Import app        : {startup:.4f} detik')
+        if loaded:
+            print(f'[ERROR] Modul berat ter-load saat import app: {", ".join(loaded)}')
+            failures.append('modul berat saat import app')
+        if startup > args.cold_import_budget:
+            print(f'[ERROR] Cold import app melebihi {args.cold_import_budget} detik')
+            failures.append('waktu cold import app')
+    report = run_tests_on_all_audio(args.audio_folder, args.payload, workers=args.workers, store_path=args.store,
+                                    csv_path=args.csv, json_path=args.json, recursive=args.recursive,
+                                    bits_per_coeff=args.bits_per_coeff, peak_memory=not args.skip_peak_memory,
+                                    force=args.force)
+    # Puncak memori di atas batas sudah dicetak di ringkasan; cukup gagalkan run
+    failures += [f'puncak memori {name}' for name in report['peak_memory_over_limit']]
+
+    for failure in full_scale_roundtrip_test():
+        print(f'[ERROR] Round trip framed skala penuh gagal ({failure})')
+        failures.append(failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import scipy.fft
+import scipy.fftpack
+
+logger = logging.getLogger(__name__)
+
+# Backend DCT yang tersedia:
+#   'scipy'   - scipy.fft (pocketfft): multithread lewat workers=, panjang dengan
+#               faktor prima besar ditangani Bluestein sehingga tetap O(N log N)
+#   'fftpack' - scipy.fftpack lama, satu thread (untuk perbandingan)
+#   'fftw'    - pyFFTW (opsional) dengan cache plan FFTW
+BACKENDS = ('scipy', 'fftpack', 'fftw')
+DEFAULT_BACKEND = 'scipy'
+
+_backend = DEFAULT_BACKEND
+_workers = os.cpu_count() or 1
+_fftw = None
+_local = threading.local()  # Batas thread per thread pemanggil (lihat limit_workers)
+
+def configure(backend=DEFAULT_BACKEND, workers=None):
+    """Pilih backend DCT dan jumlah thread yang dipakai
+
+    Args:
+        backend: Salah satu dari BACKENDS
+        workers: Jumlah thread transformasi (None = semua core)
+
+    Raises:
+        ValueError: Jika backend tidak dikenal atau pyFFTW tidak terpasang
+    """
+    global _backend, _workers, _fftw
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend transformasi tidak dikenal: {backend}")
+
+    if backend == 'fftw' and _fftw is None:
+        try:
+            import pyfftw
+            import pyfftw.interfaces.scipy_fft
+        except ImportError:
+            raise ValueError("Backend 'fftw' membutuhkan paket pyfftw")
+        # Simpan plan FFTW agar dipakai ulang untuk panjang yang sama
+        pyfftw.interfaces.cache.enable()
+        pyfftw.interfaces.cache.set_keepalive_time(60)
+        _fftw = pyfftw.interfaces.scipy_fft
+
+    _backend = backend
+    _workers = workers or os.cpu_count() or 1
+    logger.info(f"Backend transformasi: {_backend} ({_workers} thread)")
+
+def backend_info():
+    """Backend dan jumlah thread yang sedang aktif"""
+    return {'backend': _backend, 'workers': _workers}
+
+@contextmanager
+def limit_workers(workers):
+    """Batasi jumlah thread transformasi yang dipakai di thread pemanggil
+
+    Dipakai oleh pemanggil yang sudah paralel (thread per kanal, thread
+    pool request), agar jumlah thread total tidak menjadi kelipatan jumlah
+    core.
+
+    Args:
+        workers: Jumlah thread maksimal per transformasi (minimal 1)
+    """
+    previous = getattr(_local, 'workers', None)
+    _local.workers = max(1, workers)
+    try:
+        yield
+    finally:
+        _local.workers = previous
+
+def active_workers():
+    """Jumlah thread transformasi yang berlaku di thread pemanggil"""
+    limit = getattr(_local, 'workers', None)
+    return min(limit, _workers) if limit else _workers
+
+def is_fast_length(n):
+    """Cek apakah n hanya memiliki faktor prima kecil (2, 3, 5, ...)
+
+    Panjang seperti ini ditransformasi tanpa jalur lambat; ukuran frame
+    sebaiknya selalu memenuhi syarat ini.
+    """
+    return scipy.fft.next_fast_len(n, real=True) == n
+
+def dct(x, norm='ortho', axis=-1, overwrite_x=False):
+    """DCT tipe II sepanjang axis dengan backend yang aktif
+
+    Args:
+        x: Array input
+        norm: Normalisasi ('ortho' agar dapat dibalik tepat oleh idct)
+        axis: Sumbu transformasi
+        overwrite_x: Izinkan backend menimpa x untuk menghemat alokasi
+
+    Returns:
+        Koefisien DCT
+    """
+    if _backend == 'scipy':
+        return scipy.fft.dct(x, norm=norm, axis=axis, overwrite_x=overwrite_x, workers=active_workers())
+    if _backend == 'fftw':
+        return _fftw.dct(x, norm=norm, axis=axis, overwrite_x=overwrite_x, workers=active_workers())
+    return scipy.fftpack.dct(x, norm=norm, axis=axis, overwrite_x=overwrite_x)
+
+def idct(x, norm='ortho', axis=-1, overwrite_x=False):
+    """Invers DCT tipe II (DCT tipe III) sepanjang axis dengan backend yang aktif
+
+    Args:
+        x: Koefisien DCT
+        norm: Normalisasi, harus sama dengan saat dct
+        axis: Sumbu transformasi
+        overwrite_x: Izinkan backend menimpa x untuk menghemat alokasi
+
+    Returns:
+        Sinyal hasil rekonstruksi
+    """
+    if _backend == 'scipy':
+        return scipy.fft.idct(x, norm=norm, axis=axis, overwrite_x=overwrite_x, workers=active_workers())
+    if _backend == 'fftw':
+        return _fftw.idct(x, norm=norm, axis=axis, overwrite_x=overwrite_x, workers=active_workers())
+    return scipy.fftpack.idct(x, norm=norm, axis=axis, overwrite_x=overwrite_x)
@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def content_hash(path):
+    """Hitung hash SHA-256 dari isi file secara streaming
+
+    Args:
+        path: Path ke file
+
+    Returns:
+        Hash dalam bentuk string heksadesimal
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class TransformCache:
+    """Cache array NumPy (PCM hasil decode, koefisien DCT) berbasis hash isi audio
+
+    Entri disimpan di memori dan, jika disk_dir diberikan, juga di disk.
+    Masing-masing tingkat punya batas ukuran sendiri dan membuang entri
+    yang paling lama tidak dipakai (LRU). Array yang dikembalikan bersifat
+    read-only karena dapat dipakai bersama oleh beberapa pemanggil.
+    """
+
+    def __init__(self, memory_budget=256 * 1024 * 1024, disk_budget=0, disk_dir=None):
+        """
+        Args:
+            memory_budget: Batas ukuran cache memori dalam bytes
+            disk_budget: Batas ukuran cache disk dalam bytes (0 = tanpa disk)
+            disk_dir: Direktori cache disk
+        """
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget if disk_dir else 0
+        self.disk_dir = disk_dir
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_budget:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.npy')
+
+    def _load_disk_index(self):
+        """Bangun indeks LRU disk dari file yang sudah ada, diurutkan berdasarkan mtime"""
+        entries = []
+        for filename in os.listdir(self.disk_dir):
+            if filename.endswith('.npy'):
+                path = os.path.join(self.disk_dir, filename)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._disk[path] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_memory(self):
+        while self._memory_bytes > self.memory_budget and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_budget and self._disk:
+            path, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key, array):
+        """Simpan array di cache memori (dipanggil dengan lock)"""
+        if array.nbytes > self.memory_budget:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.nbytes
+        self._memory[key] = array
+        self._memory_bytes += array.nbytes
+        self._evict_memory()
+
+    def get(self, key):
+        """Ambil array dari cache
+
+        Args:
+            key: Kunci cache, misalnya 'legacy-dct:<hash>'
+
+        Returns:
+            Array read-only, atau None jika tidak ada di cache
+        """
+        with self._lock:
+            array = self._memory.get(key)
+            if array is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return array
+
+            path = self._disk_path(key) if self.disk_budget else None
+            if path is None or path not in self._disk:
+                self.misses += 1
+                return None
+
+        try:
+            array = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entri cache disk rusak, dihapus: {str(e)}")
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(path, 0)
+                self.misses += 1
+            return None
+
+        array.flags.writeable = False
+        with self._lock:
+            if path in self._disk:
+                self._disk.move_to_end(path)
+            self.disk_hits += 1
+            self._remember(key, array)
+        return array
+
+    def put(self, key, array):
+        """Simpan array ke cache memori dan disk
+
+        Args:
+            key: Kunci cache
+            array: Array NumPy; disimpan sebagai salinan read-only
+
+        Returns:
+            Array read-only yang disimpan
+        """
+        array = np.array(array, copy=True)
+        array.flags.writeable = False
+
+        if self.disk_budget and array.nbytes <= self.disk_budget:
+            path = self._disk_path(key)
+            partial = path + '.partial'
+            try:
+                with open(partial, 'wb') as f:
+                    np.save(f, array)
+                os.replace(partial, path)
+                size = os.path.getsize(path)
+                with self._lock:
+                    self._disk_bytes -= self._disk.pop(path, 0)
+                    self._disk[path] = size
+                    self._disk_bytes += size
+                    self._evict_disk()
+            except OSError as e:
+                logger.warning(f"Gagal menyimpan cache ke disk: {str(e)}")
+
+        with self._lock:
+            self._remember(key, array)
+        return array
+
+    def stats(self):
+        """Statistik cache untuk monitoring
+
+        Returns:
+            Dictionary berisi jumlah hit, miss, eviksi dan pemakaian memori/disk
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'memory_budget': self.memory_budget,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+                'disk_budget': self.disk_budget,
+            }